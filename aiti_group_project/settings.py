@@ -37,6 +37,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +99,45 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+JOBS_ROOT = BASE_DIR / 'jobs'
+
+# Klientų suvestinių šaltinis: 'materialized' (ClientStats lentelė), 'database' (SQL agregacija)
+# 'pandas' (visi užsakymai grupuojami pandas) arba 'parallel' (numpy agregacija procesų telkinyje,
+# užsakymų stulpeliai perduodami per bendrą atmintį – žr. dashboard/parallel.py)
+ANALYTICS_BACKEND = 'materialized'
+
+# Procesų skaičius 'parallel' backend'ui; None – tiek, kiek branduolių
+ANALYTICS_WORKERS = None
+
+# Gijų telkinys async view'ų pandas/ORM darbams (dashboard.concurrency); None – min(4, branduoliai + 1),
+# 0 – vykdyti Django sinchroninėje gijoje
+ANALYTICS_THREADS = None
+
+# Kiek laikotarpio (from/to/cohort filtrų) analitikos rezultatų laikoma podėlyje (dashboard.caching);
+# visos istorijos rezultatai laikomi visada, kol nepasikeičia duomenų karta
+ANALYTICS_WINDOW_CACHE_ENTRIES = 64
+
+# Arrow momentinės kopijos katalogas (write_snapshot komanda, atnaujinama po įkėlimo); None – išjungta
+ANALYTICS_SNAPSHOT_DIR = BASE_DIR / 'snapshots'
+
+# RFM tertilių ribos: 'exact' (pd.qcut per visus klientus) arba 'sketch' (KLL eskizai, ~1 % rango paklaida)
+RFM_SCORING = 'exact'
+RFM_SKETCH_K = 200
+
+# CLV modelis: 'simple' (Frequency × Monetary), 'historical' arba 'bgnbd' (BG/NBD + Gamma-Gamma, reikia scipy)
+CLV_MODEL = 'simple'
+
+# Užklausų profiliavimas (Server-Timing antraštė, /metrics/); ?_profile=cprofile|pyinstrument
+# veikia, kai PROFILING_CAPTURE įjungtas (DEBUG režime arba administratoriams)
+PROFILING_ENABLED = True
+PROFILING_CAPTURE = DEBUG
+# Dalis užklausų, kurių cProfile įrašomas į PROFILING_DIR (0 – išjungta)
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_DIR = BASE_DIR / 'profiles'
+# tracemalloc leidžia matyti Python atminties piką, bet lėtina visas užklausas
+PROFILING_TRACEMALLOC = False
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 LOGIN_URL = '/prisijungti/'
 LOGIN_REDIRECT_URL = '/rfm/'
 
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from dashboard.profiling import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include('dashboard.urls')),
 ]
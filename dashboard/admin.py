@@ -1,13 +1,58 @@
 from django.contrib import admin
-from .models import Client, Order
+from .models import (
+    Client, ClientStats, CohortMonthlyStats, DatasetVersion, Job, Order, client_cohort_months,
+    refresh_client_aggregates,
+)
 
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
     list_display = ('first_name', 'last_name', 'email', 'created_at')
     search_fields = ('first_name', 'last_name', 'email')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'created_at' in form.changed_data:
+            # Mėnesinės suvestinės laiko kliento kohortos kopiją
+            refresh_client_aggregates([obj.pk])
+        DatasetVersion.bump()
+
+    def delete_model(self, request, obj):
+        cohort_months = client_cohort_months([obj.pk])
+        super().delete_model(request, obj)
+        # Mėnesinės suvestinės ištrinamos kaskadiškai, kohortų eilutės perskaičiuojamos
+        CohortMonthlyStats.objects.refresh(cohort_months)
+        DatasetVersion.bump()
+
+    def delete_queryset(self, request, queryset):
+        cohort_months = client_cohort_months(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        CohortMonthlyStats.objects.refresh(cohort_months)
+        DatasetVersion.bump()
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('client', 'order_date', 'total_amount')
     list_filter = ('order_date',)
     search_fields = ('client__first_name', 'client__last_name', 'client__email')
+
+    def delete_queryset(self, request, queryset):
+        client_ids = set(queryset.values_list('client_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_client_aggregates(client_ids)
+        DatasetVersion.bump()
+
+@admin.register(ClientStats)
+class ClientStatsAdmin(admin.ModelAdmin):
+    list_display = ('client', 'order_count', 'first_order_date', 'last_order_date', 'total_spent')
+    search_fields = ('client__first_name', 'client__last_name', 'client__email')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'status', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
@@ -0,0 +1,103 @@
+from django.conf import settings
+
+from .backends import (
+    client_stats_batches,
+    cohort_activity_queryset,
+    cohort_sizes_queryset,
+    get_client_stats_dataframe,
+    monthly_revenue_queryset,
+)
+from .caching import get_cached
+from .charts import clv_charts, frequency_charts, monthly_series, rfm_charts
+from .clv import build_clv_frame, client_features, get_clv_model
+from .cohorts import build_cohort_matrices
+from .profiling import instrument
+from .rfm import calculate_rfm
+from .sketches import RFMSketches
+
+
+def build_frequency_frame(stats):
+    return stats[['client_id', 'first_name', 'last_name', 'email', 'order_count', 'total_spent']].copy()
+
+
+def _cache_name(name, window):
+    return f'{name}@{window.key}' if window is not None else name
+
+
+@instrument()
+def get_client_stats(window=None):
+    return get_cached(_cache_name('client_stats', window), lambda: get_client_stats_dataframe(window=window))
+
+
+@instrument()
+def get_rfm_sketches(window=None):
+    """Visai istorijai eskizai pildomi iš ClientStats dalimis; laikotarpiui – iš jo suvestinės"""
+    k = settings.RFM_SKETCH_K
+    if window is None:
+        builder = lambda: RFMSketches.from_batches(client_stats_batches(), k=k)
+    else:
+        builder = lambda: RFMSketches.from_stats(get_client_stats(window), k=k)
+    return get_cached(_cache_name('rfm_sketches', window), builder)
+
+
+@instrument()
+def get_rfm_frame(window=None):
+    if settings.RFM_SCORING == 'sketch':
+        return get_cached(
+            _cache_name('rfm:sketch', window),
+            lambda: calculate_rfm(get_client_stats(window), sketches=get_rfm_sketches(window))
+        )
+    return get_cached(_cache_name('rfm', window), lambda: calculate_rfm(get_client_stats(window)))
+
+
+@instrument()
+def get_clv_features(window=None):
+    return get_cached(_cache_name('clv_features', window), lambda: client_features(get_client_stats(window)))
+
+
+@instrument()
+def get_fitted_clv_model(name=None):
+    """CLV modelis apmokomas vieną kartą kiekvienai duomenų kartai (visai istorijai)"""
+    name = name or settings.CLV_MODEL
+    return get_cached(f'clv_model:{name}', lambda: get_clv_model(name).fit(get_clv_features()))
+
+
+@instrument()
+def get_clv_frame(model=None, window=None):
+    model = model or settings.CLV_MODEL
+    return get_cached(
+        _cache_name(f'clv:{model}', window),
+        lambda: build_clv_frame(get_clv_features(window), get_fitted_clv_model(model))
+    )
+
+
+@instrument()
+def get_frequency_frame(window=None):
+    return get_cached(_cache_name('frequency', window), lambda: build_frequency_frame(get_client_stats(window)))
+
+
+@instrument()
+def get_cohort_matrices(window=None):
+    return get_cached(
+        _cache_name('cohorts', window),
+        lambda: build_cohort_matrices(cohort_activity_queryset(window), cohort_sizes_queryset(window))
+    )
+
+
+@instrument()
+def get_rfm_charts(window=None):
+    return get_cached(_cache_name('charts:rfm', window), lambda: rfm_charts(get_rfm_frame(window)))
+
+
+@instrument()
+def get_clv_charts(model=None, window=None):
+    model = model or settings.CLV_MODEL
+    return get_cached(
+        _cache_name(f'charts:clv:{model}', window),
+        lambda: {**clv_charts(get_clv_frame(model, window)), **monthly_series(monthly_revenue_queryset(window))}
+    )
+
+
+@instrument()
+def get_frequency_charts(window=None):
+    return get_cached(_cache_name('charts:frequency', window), lambda: frequency_charts(get_frequency_frame(window)))
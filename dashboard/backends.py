@@ -0,0 +1,249 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, Sum
+
+from .models import Client, ClientMonthlyStats, ClientStats, CohortMonthlyStats, Order
+from .parallel import parallel_aggregate
+from .profiling import instrument
+from .store import get_order_store
+
+STATS_COLUMNS = [
+    'client_id', 'first_name', 'last_name', 'email',
+    'order_count', 'first_order_date', 'last_order_date', 'total_spent'
+]
+
+CLIENT_FIELDS = {
+    'client__first_name': 'first_name',
+    'client__last_name': 'last_name',
+    'client__email': 'email',
+}
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class DateWindow:
+    """Mėnesių intervalas (imtinai) ir, pasirinktinai, klientų įsigijimo kohortos intervalas"""
+    start: date = None
+    end: date = None
+    cohort_start: date = None
+    cohort_end: date = None
+
+    @classmethod
+    def from_query(cls, params):
+        window = cls(
+            start=_parse_month(params.get('from')),
+            end=_parse_month(params.get('to')),
+            cohort_start=_parse_month(params.get('cohort_from')),
+            cohort_end=_parse_month(params.get('cohort_to')),
+        )
+        return window if window.key.strip(':') else None
+
+    @property
+    def key(self):
+        return ':'.join(month.strftime('%Y-%m') if month else '' for month in (
+            self.start, self.end, self.cohort_start, self.cohort_end
+        ))
+
+    def filter_clients(self, queryset):
+        """Pritaiko kohortos (įsigijimo mėnesio) filtrą; Client ir mėnesinės suvestinės turi cohort_month stulpelį"""
+        if self.cohort_start:
+            queryset = queryset.filter(cohort_month__gte=self.cohort_start)
+        if self.cohort_end:
+            queryset = queryset.filter(cohort_month__lte=self.cohort_end)
+        return queryset
+
+    def filter_monthly(self, queryset):
+        if self.start:
+            queryset = queryset.filter(month__gte=self.start)
+        if self.end:
+            queryset = queryset.filter(month__lte=self.end)
+        return self.filter_clients(queryset)
+
+
+def empty_client_stats():
+    """Tuščia suvestinė su tais pačiais stulpelių tipais kaip užpildyta (pvz. laikotarpis be užsakymų),
+    kad RFM/CLV skaičiavimai ir diagramos veiktų be atskirų tuščio atvejo šakų"""
+    return pd.DataFrame({
+        'client_id': pd.Series(dtype='int64'),
+        'first_name': pd.Series(dtype=object),
+        'last_name': pd.Series(dtype=object),
+        'email': pd.Series(dtype=object),
+        'order_count': pd.Series(dtype='int64'),
+        'first_order_date': pd.Series(dtype='datetime64[ns]'),
+        'last_order_date': pd.Series(dtype='datetime64[ns]'),
+        'total_spent': pd.Series(dtype='float64'),
+    })
+
+
+def _stats_dataframe(rows, prefix=''):
+    df = pd.DataFrame(list(rows))
+    if df.empty:
+        return empty_client_stats()
+    df.rename(columns=CLIENT_FIELDS, inplace=True)
+    if prefix:
+        df.rename(columns=lambda column: column.removeprefix(prefix), inplace=True)
+    df = df[STATS_COLUMNS]
+    df['first_order_date'] = pd.to_datetime(df['first_order_date'])
+    df['last_order_date'] = pd.to_datetime(df['last_order_date'])
+    df['total_spent'] = df['total_spent'].astype(float)
+    return df
+
+
+@instrument()
+def get_orders_dataframe():
+    """Užsakymai su klientų laukais iš stulpelinės saugyklos (žr. store.py)"""
+    return get_order_store().to_dataframe()
+
+
+def materialized_client_stats():
+    """Skaito iš anksto palaikomą ClientStats lentelę"""
+    return _stats_dataframe(ClientStats.objects.order_by('client_id').values(
+        'client_id', *CLIENT_FIELDS,
+        'order_count', 'first_order_date', 'last_order_date', 'total_spent'
+    ))
+
+
+def client_aggregate_queryset(orders=None):
+    orders = Order.objects.all() if orders is None else orders
+    return orders.values('client_id', *CLIENT_FIELDS).annotate(
+        order_count=Count('id'),
+        first_order_date=Min('order_date'),
+        last_order_date=Max('order_date'),
+        total_spent=Sum('total_amount'),
+    ).order_by('client_id')
+
+
+def monthly_revenue_queryset(window=None):
+    """Pajamos pagal mėnesį iš ClientMonthlyStats (nereikia skenuoti užsakymų)"""
+    monthly = ClientMonthlyStats.objects.all()
+    if window is not None:
+        monthly = window.filter_monthly(monthly)
+    return monthly.values(year_month=F('month')).annotate(total=Sum('revenue')).order_by('year_month')
+
+
+def cohort_activity_queryset(window=None):
+    """Aktyvūs klientai ir pajamos pagal (kohortos mėnuo, mėnuo) iš CohortMonthlyStats –
+    O(kohortų × mėnesių) eilučių nepriklausomai nuo klientų skaičiaus"""
+    cohorts = CohortMonthlyStats.objects.all()
+    if window is not None:
+        cohorts = window.filter_monthly(cohorts)
+    return cohorts.values('month', 'clients', 'revenue', cohort=F('cohort_month')).order_by('cohort', 'month')
+
+
+def cohort_sizes_queryset(window=None):
+    clients = Client.objects.all()
+    if window is not None:
+        clients = window.filter_clients(clients)
+    return clients.values(cohort=F('cohort_month')).annotate(
+        size=Count('id')
+    ).order_by('cohort')
+
+
+def window_aggregate_queryset(window):
+    return window.filter_monthly(ClientMonthlyStats.objects.all()).values('client_id', *CLIENT_FIELDS).annotate(
+        window_order_count=Sum('order_count'),
+        window_first_order_date=Min('first_order_date'),
+        window_last_order_date=Max('last_order_date'),
+        window_total_spent=Sum('revenue'),
+    ).order_by('client_id')
+
+
+def windowed_client_stats(window):
+    """Klientų suvestinės pasirinktam laikotarpiui – O(mėnesių × aktyvių klientų) eilučių"""
+    return _stats_dataframe(window_aggregate_queryset(window), prefix='window_')
+
+
+def database_client_stats():
+    """Agreguoja užsakymus duomenų bazėje – į Python atkeliauja tik po vieną eilutę klientui"""
+    return _stats_dataframe(client_aggregate_queryset())
+
+
+def pandas_client_stats():
+    """Senasis kelias: visi užsakymai perkeliami į pandas ir grupuojami ten"""
+    df = get_orders_dataframe()
+    if df.empty:
+        return empty_client_stats()
+    stats = df.groupby('client_id').agg(
+        first_name=('first_name', 'first'),
+        last_name=('last_name', 'first'),
+        email=('email', 'first'),
+        order_count=('id', 'count'),
+        first_order_date=('order_date', 'min'),
+        last_order_date=('order_date', 'max'),
+        total_spent=('total_amount', 'sum'),
+    ).reset_index()
+    return stats[STATS_COLUMNS]
+
+
+def client_stats_batches(batch_size=50_000):
+    """ClientStats dalimis kaip (paskutinio pirkimo diena, užsakymų sk., suma) masyvai –
+    visa klientų lentelė į atmintį nekeliama"""
+    rows = ClientStats.objects.values_list('last_order_date', 'order_count', 'total_spent')
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield _stats_batch(batch)
+            batch = []
+    if batch:
+        yield _stats_batch(batch)
+
+
+def _stats_batch(rows):
+    last_dates, counts, totals = zip(*rows)
+    return (
+        np.array(last_dates, dtype='datetime64[D]').astype(np.int64),
+        np.array(counts, dtype=np.int64),
+        np.array(totals, dtype=np.float64),
+    )
+
+
+def parallel_client_stats(workers=None):
+    """Užsakymai agreguojami keliuose procesuose pagal client_id skaidinius (žr. parallel.py)"""
+    store = get_order_store()
+    clients, counts, first_days, last_days, cents = parallel_aggregate(
+        store.client_ids, store.days, store.cents, workers=workers or settings.ANALYTICS_WORKERS
+    )
+    first_names, last_names, emails = store.client_names(clients)
+    return pd.DataFrame({
+        'client_id': clients,
+        'first_name': first_names,
+        'last_name': last_names,
+        'email': emails,
+        'order_count': counts,
+        'first_order_date': pd.to_datetime(first_days.astype('datetime64[D]')),
+        'last_order_date': pd.to_datetime(last_days.astype('datetime64[D]')),
+        'total_spent': cents / 100,
+    })
+
+
+ANALYTICS_BACKENDS = {
+    'materialized': materialized_client_stats,
+    'database': database_client_stats,
+    'pandas': pandas_client_stats,
+    'parallel': parallel_client_stats,
+}
+
+
+@instrument()
+def get_client_stats_dataframe(backend=None, window=None):
+    if window is not None:
+        return windowed_client_stats(window)
+
+    backend = backend or settings.ANALYTICS_BACKEND
+    try:
+        build = ANALYTICS_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f'Nežinomas analitikos backend: {backend}')
+    # Kviečiama už try ribų: backend'o viduje kilęs KeyError nėra „nežinomas backend“
+    return build()
@@ -0,0 +1,87 @@
+"""Analitikos rezultatų podėlis proceso atmintyje.
+
+Laikomi tik dabartinės duomenų kartos (DatasetVersion) rezultatai: pasikeitus kartai visi
+ankstesni objektai atlaisvinami iš karto, o ne laukia išstūmimo. Objektai grąžinami tiesiogiai
+(be pickle kopijos kiekvienam skaitymui), todėl kviečiantieji jų nekeičia – išvestiniai
+rėmeliai kuriami per .copy(), filtravimą ar sort_values. Laikotarpio (`name@window`) rezultatų
+kiekis ribojamas ANALYTICS_WINDOW_CACHE_ENTRIES – seniausiai naudoti išmetami pirmi.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import DatasetVersion
+
+WINDOW_SEPARATOR = '@'
+
+_version = None
+_results = {}
+_windowed = OrderedDict()
+_lock = threading.Lock()
+
+_building = {}
+_building_lock = threading.Lock()
+
+
+def _lookup(version, name):
+    """Grąžina (rastas, rezultatas); pasikeitus kartai ankstesni rezultatai išmetami"""
+    global _version
+    with _lock:
+        if _version != version:
+            _version = version
+            _results.clear()
+            _windowed.clear()
+        if name in _windowed:
+            _windowed.move_to_end(name)
+            return True, _windowed[name]
+        if name in _results:
+            return True, _results[name]
+    return False, None
+
+
+def _store(version, name, result):
+    with _lock:
+        if _version != version:
+            # Kol skaičiavome, duomenys pasikeitė – pasenusio rezultato nelaikome
+            return
+        if WINDOW_SEPARATOR not in name:
+            _results[name] = result
+            return
+        _windowed[name] = result
+        _windowed.move_to_end(name)
+        while len(_windowed) > settings.ANALYTICS_WINDOW_CACHE_ENTRIES:
+            _windowed.popitem(last=False)
+
+
+def get_cached(name, builder):
+    """Grąžina `builder()` rezultatą iš podėlio; raktas priklauso nuo duomenų kartos,
+    todėl po kiekvieno įkėlimo ar Order pakeitimo senas rezultatas nebenaudojamas.
+    Tą patį raktą lygiagrečiai skaičiuoja tik viena gija – kitos laukia jos rezultato"""
+    version = DatasetVersion.current().cache_key
+    found, result = _lookup(version, name)
+    if found:
+        return result
+
+    key = (version, name)
+    with _building_lock:
+        lock = _building.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            found, result = _lookup(version, name)
+            if not found:
+                result = builder()
+                _store(version, name, result)
+    finally:
+        with _building_lock:
+            _building.pop(key, None)
+    return result
+
+
+def clear_cache():
+    """Atlaisvina visus rezultatus (pvz. po atšaukto sintetinių duomenų įkėlimo)"""
+    global _version
+    with _lock:
+        _version = None
+        _results.clear()
+        _windowed.clear()
@@ -0,0 +1,128 @@
+"""Diagramų duomenų serijos RFM, CLV ir pirkimų dažnio puslapiams.
+
+Visos serijos skaičiuojamos vektoriškai iš analitikos rezultatų (kurie patys gaunami iš vienos
+bendros klientų suvestinės get_client_stats) ir grąžinamos kaip JSON tinkami sąrašai.
+Sklaidos diagrama ribojama SCATTER_MAX_POINTS taškų, kad JSON dydis nepriklausytų nuo klientų skaičiaus.
+"""
+import numpy as np
+import pandas as pd
+
+HIST_BINS = 10
+SCATTER_MAX_POINTS = 2000
+CLV_BIN_WIDTH = 1000
+CLV_MAX_BINS = 100
+CLV_SEGMENTS = ['Žemas', 'Vidutinis', 'Aukštas']
+FREQUENCY_INTERVAL_BINS = [1, 5, 10, 15, 20, 25, 30, 1000]
+FREQUENCY_INTERVAL_LABELS = ['1-5', '6-10', '11-15', '16-20', '21-25', '26-30', '31+']
+
+
+def histogram(values, bins=HIST_BINS):
+    """Lygaus pločio histograma: (kraštai, kiekiai); tuščiai imčiai – tuščios serijos"""
+    if not len(values):
+        return np.array([]), []
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    return edges, counts.tolist()
+
+
+def interval_labels(edges, separator='-'):
+    return [f"{int(left)}{separator}{int(right)}" for left, right in zip(edges[:-1], edges[1:])]
+
+
+def rfm_charts(rfm):
+    segment_counts = rfm['Segmentas'].value_counts()
+    segment_avg = rfm.groupby('Segmentas')[['Recency', 'Frequency', 'Monetary']].mean().round(1)
+    maxima = rfm[['Recency', 'Frequency', 'Monetary']].max()
+    normalized = (segment_avg / maxima * 100).round(1)
+
+    recency_edges, recency_counts = histogram(rfm['Recency'])
+    _, frequency_counts = histogram(rfm['Frequency'])
+    _, monetary_counts = histogram(rfm['Monetary'])
+
+    return {
+        'segment_labels': segment_counts.index.tolist(),
+        'segment_values': segment_counts.tolist(),
+        'segment_avg_labels': segment_avg.index.tolist(),
+        'segment_avg': segment_avg.to_dict(orient='index'),
+        'segment_values_avg': {column: normalized[column].tolist() for column in normalized.columns},
+        'hist_labels': interval_labels(recency_edges),
+        'hist_recency': recency_counts,
+        'hist_frequency': frequency_counts,
+        'hist_monetary': monetary_counts,
+        'scatter': rfm_scatter(rfm['Recency'].to_numpy(), rfm['Frequency'].to_numpy()),
+    }
+
+
+def rfm_scatter(recency, frequency, max_points=SCATTER_MAX_POINTS):
+    """Unikalūs (Recency, Frequency) taškai – pasikartojantys diagramoje vis tiek sutampa;
+    jei jų daugiau nei max_points, imama tolygi atsitiktinė imtis su fiksuota sėkla"""
+    if not len(recency):
+        return []
+    points = np.unique(np.column_stack([recency, frequency]), axis=0)
+    if len(points) > max_points:
+        rows = np.sort(np.random.default_rng(0).choice(len(points), size=max_points, replace=False))
+        points = points[rows]
+    return [{'x': x, 'y': y} for x, y in points.tolist()]
+
+
+def clv_charts(clv):
+    values = clv['CLV'].to_numpy(dtype=float)
+
+    # [0, 1000), [1000, 2000), ... iki didžiausios reikšmės; neigiamos reikšmės neskaičiuojamos.
+    # Jei intervalų būtų daugiau nei CLV_MAX_BINS, plotis didinamas 1000 kartotiniais
+    top = int(values.max()) if len(values) else 0
+    width = CLV_BIN_WIDTH * max(-(-top // (CLV_BIN_WIDTH * CLV_MAX_BINS)), 1)
+    edges = np.arange(0, top + width, width) if len(values) else np.array([0])
+    bins = np.floor(values / width).astype(np.int64)
+    counted = (values >= 0) & (bins < len(edges) - 1)
+    hist_values = np.bincount(bins[counted], minlength=max(len(edges) - 1, 0))
+
+    top_clients = clv.nlargest(5, 'CLV') if len(clv) else clv
+    segment_avg = clv['CLV'].groupby(clv_segments(clv['CLV']), observed=False).mean().round(2).dropna()
+
+    return {
+        'hist_labels': interval_labels(edges, '–'),
+        'hist_values': hist_values.tolist(),
+        'top_labels': top_clients['first_name'].tolist(),
+        'top_values': top_clients['CLV'].tolist(),
+        'segment_labels': segment_avg.index.tolist(),
+        'segment_values': segment_avg.astype(float).tolist(),
+    }
+
+
+def clv_segments(values):
+    """Trys vienodo dydžio CLV grupės; jei kvantilių ribos sutampa (pvz. maža paieškos imtis) – pagal rangą"""
+    try:
+        return pd.qcut(values, q=3, labels=CLV_SEGMENTS)
+    except ValueError:
+        groups = (values.rank(method='first').to_numpy() - 1) * 3 // max(len(values), 1)
+        return pd.Categorical.from_codes(groups.astype(np.int64), CLV_SEGMENTS)
+
+
+def monthly_series(monthly):
+    """monthly_revenue_queryset eilutės -> mėnesių etiketės ir pajamų sumos"""
+    monthly = list(monthly)
+    return {
+        'monthly_labels': [row['year_month'].strftime('%Y-%m') for row in monthly],
+        'monthly_values': [float(row['total']) for row in monthly],
+    }
+
+
+def frequency_charts(frequency):
+    order_counts = frequency['order_count'].to_numpy()
+    levels, positions, clients = np.unique(order_counts, return_inverse=True, return_counts=True)
+    revenue = np.bincount(positions, weights=frequency['total_spent'].to_numpy(dtype=float), minlength=len(levels))
+
+    intervals = pd.cut(
+        frequency['order_count'], bins=FREQUENCY_INTERVAL_BINS, labels=FREQUENCY_INTERVAL_LABELS,
+        right=True, include_lowest=True,
+    ).value_counts().sort_index()
+
+    return {
+        'freq_labels': levels.astype(str).tolist(),
+        'freq_values': clients.tolist(),
+        'cumulative_values': np.cumsum(clients).tolist(),
+        'freq_revenue_labels': levels.astype(str).tolist(),
+        'freq_revenue_values': revenue.round(2).tolist(),
+        'interval_labels': intervals.index.astype(str).tolist(),
+        'interval_values': intervals.tolist(),
+    }
@@ -0,0 +1,29 @@
+from ..profiling import instrument
+from .features import client_features
+from .historical import HistoricalCLV, historical_clv_frame
+from .probabilistic import BGNBDGammaGammaCLV
+from .simple import SimpleCLV
+
+CLV_MODELS = {model.name: model for model in (SimpleCLV, HistoricalCLV, BGNBDGammaGammaCLV)}
+
+
+def get_clv_model(name):
+    try:
+        return CLV_MODELS[name]()
+    except KeyError:
+        raise ValueError(f'Nežinomas CLV modelis: {name}')
+
+
+@instrument()
+def calculate_clv(stats):
+    return historical_clv_frame(client_features(stats))
+
+
+@instrument()
+def build_clv_frame(features, model):
+    clv = features[['client_id', 'first_name', 'last_name', 'email']].copy()
+    clv['Recency'] = features['recency_days']
+    clv['Frequency'] = features['num_orders']
+    clv['Monetary'] = features['total_spent']
+    clv['CLV'] = model.predict(features)
+    return clv
@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def client_features(stats):
+    """Vienas vektorizuotas praėjimas per ClientStats eilutes: visi CLV modeliams reikalingi požymiai"""
+    features = stats[['client_id', 'first_name', 'last_name', 'email']].copy()
+    first_purchase = stats['first_order_date']
+    last_purchase = stats['last_order_date']
+    num_orders = stats['order_count'].to_numpy()
+    total_spent = stats['total_spent'].astype(float).to_numpy()
+
+    features['first_purchase'] = first_purchase
+    features['last_purchase'] = last_purchase
+    features['num_orders'] = num_orders
+    features['total_spent'] = total_spent
+    features['recency_days'] = (last_purchase.max() - last_purchase).dt.days
+    features['active_days'] = (last_purchase - first_purchase).dt.days + 1
+    features['avg_order_value'] = total_spent / num_orders
+
+    # BG/NBD žymėjimas: x – pakartotiniai pirkimai, t_x – paskutinio pirkimo laikas, T – kliento amžius (savaitėmis)
+    observation_end = last_purchase.max() + np.timedelta64(1, 'D')
+    features['x'] = num_orders - 1
+    features['t_x'] = (last_purchase - first_purchase).dt.days / 7
+    features['T'] = (observation_end - first_purchase).dt.days / 7
+    return features.reset_index(drop=True)
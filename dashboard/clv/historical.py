@@ -0,0 +1,22 @@
+class HistoricalCLV:
+    """Istorinė metinė vertė: vidutinė užsakymo vertė × užsakymų per metus"""
+    name = 'historical'
+    label = 'Istorinė metinė vertė'
+
+    def fit(self, features):
+        return self
+
+    def predict(self, features):
+        active_years = features['active_days'].to_numpy() / 365
+        orders_per_year = features['num_orders'].to_numpy() / active_years
+        return features['avg_order_value'].to_numpy() * orders_per_year
+
+
+def historical_clv_frame(features):
+    grouped = features[['client_id', 'first_name', 'last_name', 'email', 'first_purchase',
+                        'last_purchase', 'num_orders', 'total_spent', 'active_days']].copy()
+    grouped['active_years'] = grouped['active_days'] / 365
+    grouped['avg_order_value'] = features['avg_order_value']
+    grouped['orders_per_year'] = grouped['num_orders'] / grouped['active_years']
+    grouped['clv'] = HistoricalCLV().predict(features)
+    return grouped.round(2)
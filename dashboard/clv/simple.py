@@ -0,0 +1,10 @@
+class SimpleCLV:
+    """Dashboard'o formulė: užsakymų skaičius × bendra išleista suma"""
+    name = 'simple'
+    label = 'Frequency × Monetary'
+
+    def fit(self, features):
+        return self
+
+    def predict(self, features):
+        return features['num_orders'].to_numpy() * features['total_spent'].to_numpy()
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from .profiling import instrument
+
+SIZE_COLUMN = 'Klientai'
+
+
+def _month_number(values):
+    values = pd.to_datetime(values, utc=True)
+    return values.dt.year * 12 + values.dt.month - 1
+
+
+def _cohort_label(values):
+    return pd.to_datetime(values, utc=True).dt.strftime('%Y-%m')
+
+
+@instrument()
+def build_cohort_matrices(activity, sizes):
+    """Iš (kohorta, mėnuo, klientai, pajamos) eilučių sudaro išlaikymo (%) ir pajamų matricas:
+    eilutės – įsigijimo mėnuo, stulpeliai – mėnesiai nuo įsigijimo"""
+    activity = pd.DataFrame(list(activity), columns=['cohort', 'month', 'clients', 'revenue'])
+    sizes = pd.DataFrame(list(sizes), columns=['cohort', 'size'])
+
+    activity['period'] = _month_number(activity['month']) - _month_number(activity['cohort'])
+    activity = activity[activity['period'] >= 0]
+    activity['cohort'] = _cohort_label(activity['cohort'])
+    activity['revenue'] = activity['revenue'].astype(float)
+
+    cohort_sizes = sizes.assign(cohort=_cohort_label(sizes['cohort'])).groupby('cohort')['size'].sum()
+
+    clients = activity.pivot_table(
+        index='cohort', columns='period', values='clients', aggfunc='sum', fill_value=0
+    ).reindex(cohort_sizes.index, fill_value=0)
+    revenue = activity.pivot_table(
+        index='cohort', columns='period', values='revenue', aggfunc='sum', fill_value=0
+    ).reindex(cohort_sizes.index, fill_value=0)
+
+    retention = clients.div(cohort_sizes, axis=0).mul(100).round(1)
+    revenue = revenue.round(2)
+    for matrix in (retention, revenue):
+        matrix.columns = [str(period) for period in matrix.columns]
+        matrix.insert(0, SIZE_COLUMN, cohort_sizes)
+        matrix.index.name = 'Kohorta'
+
+    return retention, revenue
@@ -0,0 +1,57 @@
+"""Blokuojančių skaičiavimų vykdymas async view'uose.
+
+pandas skaičiavimai, ORM užklausos ir šablonų atvaizdavimas async view'uose vykdomi ribotame
+gijų telkinyje (ANALYTICS_THREADS), o ne bendroje Django sinchroninėje gijoje, todėl lėti
+sinchroniniai eksportai neužlaiko puslapių, o vienas ASGI procesas aptarnauja daug žiūrovų.
+Kiekviena telkinio gija turi savo DB jungtį; po kiekvieno darbo ji uždaroma pagal CONN_MAX_AGE,
+kaip ir užklausos pabaigoje.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .profiling import profiled_queries
+
+_executor = None
+_lock = threading.Lock()
+
+
+def resolve_threads():
+    threads = getattr(settings, 'ANALYTICS_THREADS', None)
+    return min(4, (os.cpu_count() or 1) + 1) if threads is None else threads
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=resolve_threads(), thread_name_prefix='analytics')
+        return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        with profiled_queries():
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Vykdo func telkinyje ir laukia rezultato; ANALYTICS_THREADS = 0 – Django sinchroninėje gijoje
+    (pvz. benchmark komandai, kurios duomenys matomi tik jos transakcijoje)"""
+    if resolve_threads() == 0:
+        return await sync_to_async(func)(*args, **kwargs)
+    call = functools.partial(_run, func, args, kwargs)
+    return await sync_to_async(call, thread_sensitive=False, executor=get_executor())()
+
+
+async def gather_blocking(*calls):
+    """Lygiagrečiai vykdo kelis nepriklausomus (func, *args) iškvietimus"""
+    return await asyncio.gather(*(run_blocking(*call) for call in calls))
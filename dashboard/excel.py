@@ -0,0 +1,74 @@
+"""Excel ataskaitos per openpyxl write-only darbaknygę.
+
+Eilutės rašomos tiesiai iš analitikos rezultatų stulpelių dalimis po EXCEL_CHUNK_ROWS,
+o ne per `pd.ExcelWriter`, kuris prieš įrašydamas sukuria visų langelių objektų medį.
+Visi lapai skaičiuojami iš tų pačių talpyklos rezultatų (get_client_stats), todėl pilna
+ataskaita nekartoja agregavimo kiekvienam lapui.
+"""
+import numpy as np
+from openpyxl import Workbook
+
+from .analytics import get_clv_frame, get_cohort_matrices, get_frequency_frame, get_rfm_frame
+from .profiling import instrument
+
+EXCEL_CHUNK_ROWS = 10_000
+
+
+def _cells(array):
+    """Stulpelio dalis kaip Python reikšmės; NaN paverčiamas tuščiu langeliu"""
+    if array.dtype.kind == 'f' and np.isnan(array).any():
+        array = np.where(np.isnan(array), None, array)
+    return array.tolist()
+
+
+def write_sheet(workbook, title, frame, index=False):
+    sheet = workbook.create_sheet(title)
+    if index:
+        frame = frame.reset_index()
+    sheet.append([str(column) for column in frame.columns])
+
+    columns = [frame[column].to_numpy() for column in frame.columns]
+    for start in range(0, len(frame), EXCEL_CHUNK_ROWS):
+        parts = [_cells(column[start:start + EXCEL_CHUNK_ROWS]) for column in columns]
+        for row in zip(*parts):
+            sheet.append(row)
+    return sheet
+
+
+@instrument()
+def build_workbook(output, sheets):
+    """sheets – [(lapo pavadinimas, DataFrame, ar rašyti indeksą), ...]"""
+    workbook = Workbook(write_only=True)
+    for title, frame, index in sheets:
+        write_sheet(workbook, title, frame, index)
+    workbook.save(output)
+
+
+def frequency_sheet(window=None):
+    return get_frequency_frame(window).drop(columns='total_spent')
+
+
+def build_rfm_excel(output, window=None):
+    build_workbook(output, [('RFM', get_rfm_frame(window), False)])
+
+
+def build_clv_excel(output, model=None, window=None):
+    build_workbook(output, [('CLV', get_clv_frame(model, window), False)])
+
+
+def build_frequency_excel(output, window=None):
+    build_workbook(output, [('Purchase Frequency', frequency_sheet(window), False)])
+
+
+def build_cohort_excel(output, window=None):
+    retention, revenue = get_cohort_matrices(window)
+    build_workbook(output, [('Išlaikymas', retention, True), ('Pajamos', revenue, True)])
+
+
+def build_full_report_excel(output, model=None, window=None):
+    """RFM, CLV ir pirkimų dažnis vienoje darbaknygėje"""
+    build_workbook(output, [
+        ('RFM', get_rfm_frame(window), False),
+        ('CLV', get_clv_frame(model, window), False),
+        ('Purchase Frequency', frequency_sheet(window), False),
+    ])
@@ -0,0 +1,342 @@
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Client,
+    ClientMonthlyStats,
+    ClientStats,
+    CohortMonthlyStats,
+    DatasetVersion,
+    Order,
+    acquisition_month,
+    rebuild_client_aggregates,
+    refresh_client_aggregates,
+)
+
+REQUIRED_COLUMNS = {'client_id', 'first_name', 'last_name', 'email', 'order_date', 'total_amount'}
+OPTIONAL_COLUMNS = {'external_id'}
+CHUNK_SIZE = 50_000
+BATCH_SIZE = 5_000
+
+
+class IngestError(Exception):
+    """Klaida, kurios pranešimas rodomas naudotojui"""
+
+
+@dataclass
+class IngestResult:
+    clients: int = 0
+    orders: int = 0
+    clients_updated: int = 0
+    orders_updated: int = 0
+    orders_skipped: int = 0
+
+
+def _read_excel_chunks(file, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        buffer, start = [], 0
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                # Indeksas tęsiasi tarp dalių, kaip read_csv – klaidose nurodomas failo eilutės nr.
+                yield pd.DataFrame(buffer, columns=header, index=range(start, start + len(buffer)))
+                buffer, start = [], start + len(buffer)
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header, index=range(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def read_chunks(file, chunksize=CHUNK_SIZE):
+    """Skaito CSV/Excel failą dalimis, kad atmintis nepriklausytų nuo failo dydžio.
+    Senasis .xls formatas (xlrd) dalimis neskaitomas – toks failas visas įkeliamas į atmintį"""
+    if file.name.endswith('.csv'):
+        yield from pd.read_csv(file, chunksize=chunksize)
+    elif file.name.endswith('.xlsx'):
+        yield from _read_excel_chunks(file, chunksize)
+    elif file.name.endswith('.xls'):
+        df = pd.read_excel(file)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        raise IngestError('❌ Blogas failo formatas.')
+
+
+def _check_required_values(chunk):
+    """Tuščias ar vien tarpų langelis privalomame stulpelyje – klaida su failo eilutės numeriu
+    (antraštė yra 1-oji eilutė, indeksas tęsiasi tarp dalių)"""
+    required = chunk[[column for column in chunk.columns if column in REQUIRED_COLUMNS]]
+    missing = required.isna()
+    for column in required.select_dtypes(include=['object', 'string']).columns:
+        missing[column] |= required[column].astype('string').str.strip().eq('').fillna(False).astype(bool)
+    if missing.to_numpy().any():
+        row, column = missing.stack().loc[lambda cells: cells].index[0]
+        raise IngestError(f'❌ {row + 2}-oje eilutėje neužpildytas privalomas stulpelis „{column}“.')
+
+
+def validate_chunk(chunk):
+    if not REQUIRED_COLUMNS.issubset(chunk.columns):
+        missing = REQUIRED_COLUMNS - set(chunk.columns)
+        raise IngestError(f'❌ Trūksta šių stulpelių: {", ".join(missing)}')
+
+    chunk = chunk[list(REQUIRED_COLUMNS | (OPTIONAL_COLUMNS & set(chunk.columns)))].copy()
+    _check_required_values(chunk)
+    try:
+        chunk['order_date'] = pd.to_datetime(chunk['order_date'])
+    except (ValueError, TypeError):
+        raise IngestError('❌ Blogas datos formatas.')
+    try:
+        chunk['client_id'] = pd.to_numeric(chunk['client_id']).astype('int64')
+        chunk['total_amount'] = pd.to_numeric(chunk['total_amount']).round(2)
+    except (ValueError, TypeError):
+        raise IngestError('❌ Blogas kliento ID arba sumos formatas.')
+    return chunk
+
+
+def natural_order_key(email, order_date, amount, occurrence):
+    """Užsakymo raktas be išorinio ID: el. paštas, data, suma ir eilės nr. tarp tokių pačių užsakymų"""
+    base = f'{email}|{order_date:%Y-%m-%d}|{amount:.2f}|{occurrence}'
+    return 'n:' + hashlib.sha1(base.encode()).hexdigest()
+
+
+def explicit_external_ids(chunk):
+    """external_id be tarpų ir kaukė eilutėms, kuriose jis užpildytas (None, jei stulpelio nėra)"""
+    if 'external_id' not in chunk:
+        return None, np.zeros(len(chunk), dtype=bool)
+    external = chunk['external_id'].astype('string').str.strip()
+    return external, (external.fillna('') != '').to_numpy(dtype=bool)
+
+
+def order_keys(chunk, seen):
+    """external_id stulpelis, jei jis užpildytas, kitaip natūralus raktas; `seen` tęsia
+    vienodų užsakymų numeraciją tarp failo dalių.
+
+    `seen` gyvuoja visą failą ir turi po įrašą kiekvienam skirtingam (el. paštas, data, suma)
+    deriniui, todėl atmintis auga O(unikalių užsakymų be external_id); eilutės su external_id
+    į jį nepatenka"""
+    external, present = explicit_external_ids(chunk)
+    natural = chunk[~present]
+    base = zip(natural['email'], natural['order_date'].dt.date, natural['total_amount'].astype(float))
+    natural_keys = []
+    for key in base:
+        natural_keys.append(natural_order_key(*key, seen[key]))
+        seen[key] += 1
+
+    keys = np.empty(len(chunk), dtype=object)
+    keys[~present] = natural_keys
+    if external is not None:
+        keys[present] = external.to_numpy(dtype=object)[present]
+    return pd.Series(keys, index=chunk.index)
+
+
+def _in_batches(values, batch_size):
+    values = list(values)
+    for start in range(0, len(values), batch_size):
+        yield values[start:start + batch_size]
+
+
+def ingest_orders(file, chunksize=CHUNK_SIZE, batch_size=BATCH_SIZE):
+    """Pakeičia visus klientus ir užsakymus failo turiniu vienoje transakcijoje.
+    Pasikartojantis external_id (ir skirtingose failo dalyse) – galioja paskutinė eilutė, kaip
+    append_orders, o ankstesnės įskaičiuojamos į orders_skipped. Tam per visą failą laikomi
+    įrašyti išoriniai ID (natūralūs raktai nesikartoja dėl `seen` numeracijos)"""
+    result = IngestResult()
+    inserted_created_at = {}
+    earliest_order = {}
+    seen = Counter()
+    explicit_ids = set()
+
+    with transaction.atomic():
+        Order.objects.all().delete()
+        ClientStats.objects.all().delete()
+        ClientMonthlyStats.objects.all().delete()
+        CohortMonthlyStats.objects.all().delete()
+        Client.objects.all().delete()
+
+        for chunk in read_chunks(file, chunksize):
+            chunk = validate_chunk(chunk)
+            if chunk.empty:
+                continue
+            explicit = pd.Series(explicit_external_ids(chunk)[1], index=chunk.index)
+            chunk['external_id'] = order_keys(chunk, seen)
+
+            chunk_earliest = chunk.groupby('client_id')['order_date'].min()
+            for client_id, order_date in chunk_earliest.items():
+                if client_id not in earliest_order or order_date < earliest_order[client_id]:
+                    earliest_order[client_id] = order_date
+
+            new_clients = chunk.drop_duplicates('client_id')
+            new_clients = new_clients[~new_clients['client_id'].isin(inserted_created_at.keys())]
+            clients = []
+            for row in new_clients.itertuples(index=False):
+                created_at = chunk_earliest[row.client_id]
+                inserted_created_at[row.client_id] = created_at
+                clients.append(client_with_created_at(
+                    created_at, id=row.client_id, first_name=row.first_name, last_name=row.last_name, email=row.email
+                ))
+            Client.objects.bulk_create(clients, batch_size=batch_size)
+
+            deduplicated = chunk.drop_duplicates('external_id', keep='last')
+            explicit = explicit[deduplicated.index]
+            replaced = int((explicit & deduplicated['external_id'].isin(explicit_ids)).sum())
+            explicit_ids.update(deduplicated['external_id'][explicit])
+            Order.objects.bulk_create(
+                (
+                    Order(client_id=client_id, order_date=order_date, total_amount=total_amount, external_id=external_id)
+                    for client_id, order_date, total_amount, external_id in zip(
+                        deduplicated['client_id'].tolist(),
+                        deduplicated['order_date'].dt.date.tolist(),
+                        deduplicated['total_amount'].tolist(),
+                        deduplicated['external_id'].tolist()
+                    )
+                ),
+                batch_size=batch_size,
+                # Ankstesnėje dalyje įrašytas to paties išorinio ID užsakymas pakeičiamas
+                update_conflicts=True, unique_fields=['external_id'], update_fields=['client', 'order_date', 'total_amount']
+            )
+            result.orders += len(deduplicated) - replaced
+            result.orders_skipped += len(chunk) - len(deduplicated) + replaced
+
+        if not result.orders:
+            raise IngestError('❌ Failas yra tuščias.')
+
+        moved = [
+            client_with_created_at(order_date, id=client_id)
+            for client_id, order_date in earliest_order.items()
+            if order_date < inserted_created_at[client_id]
+        ]
+        Client.objects.bulk_update(moved, ['created_at', 'cohort_month'], batch_size=batch_size)
+
+        rebuild_client_aggregates()
+        DatasetVersion.bump()
+
+    result.clients = len(inserted_created_at)
+    return result
+
+
+def client_with_created_at(order_date, **fields):
+    """Client su created_at iš pirmojo užsakymo datos ir jai atitinkančiu cohort_month (bulk_* nekviečia save())"""
+    created_at = timezone.make_aware(order_date.to_pydatetime())
+    return Client(created_at=created_at, cohort_month=acquisition_month(created_at), **fields)
+
+
+def _upsert_clients(chunk, result, batch_size):
+    """Klientai tapatinami pagal el. paštą; grąžina el. pašto → kliento ID žemėlapį ir ID klientų,
+    kurių kohorta pasikeitė (jų mėnesinės suvestinės turi būti perskaičiuotos)"""
+    latest = chunk.drop_duplicates('email', keep='last').set_index('email')
+    earliest = chunk.groupby('email')['order_date'].min()
+
+    existing = {}
+    for emails in _in_batches(latest.index, batch_size):
+        for client_id, email, first_name, last_name, created_at in Client.objects.filter(email__in=emails).values_list(
+            'id', 'email', 'first_name', 'last_name', 'created_at'
+        ):
+            existing[email] = (client_id, (first_name, last_name), created_at)
+
+    upserts, moved = [], []
+    for email, first_name, last_name in zip(latest.index, latest['first_name'], latest['last_name']):
+        client = client_with_created_at(earliest[email], first_name=first_name, last_name=last_name, email=email)
+        created_at = client.created_at
+        current = existing.get(email)
+        if current is None:
+            result.clients += 1
+        elif current[1] != (first_name, last_name):
+            result.clients_updated += 1
+        if current is None or current[1] != (first_name, last_name):
+            upserts.append(client)
+        if current is not None and created_at < current[2]:
+            moved.append(client_with_created_at(earliest[email], id=current[0]))
+
+    Client.objects.bulk_create(
+        upserts, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['email'], update_fields=['first_name', 'last_name']
+    )
+    Client.objects.bulk_update(moved, ['created_at', 'cohort_month'], batch_size=batch_size)
+
+    client_ids = {}
+    for emails in _in_batches(latest.index, batch_size):
+        client_ids.update(Client.objects.filter(email__in=emails).values_list('email', 'id'))
+    return client_ids, {client.id for client in moved}
+
+
+def _upsert_orders(chunk, result, batch_size):
+    """Įrašo tik naujus arba pasikeitusius užsakymus; grąžina paliestų klientų ID"""
+    existing = {}
+    for keys in _in_batches(chunk['external_id'], batch_size):
+        for external_id, client_id, order_date, total_amount in Order.objects.filter(external_id__in=keys).values_list(
+            'external_id', 'client_id', 'order_date', 'total_amount'
+        ):
+            existing[external_id] = (client_id, order_date, round(float(total_amount), 2))
+
+    touched, upserts = set(), []
+    for external_id, client_id, order_date, total_amount in zip(
+        chunk['external_id'].tolist(),
+        chunk['client_id'].tolist(),
+        chunk['order_date'].dt.date.tolist(),
+        chunk['total_amount'].tolist()
+    ):
+        current = existing.get(external_id)
+        if current == (client_id, order_date, total_amount):
+            result.orders_skipped += 1
+            continue
+        if current is None:
+            result.orders += 1
+        else:
+            result.orders_updated += 1
+            touched.add(current[0])
+        touched.add(client_id)
+        upserts.append(Order(
+            client_id=client_id, order_date=order_date, total_amount=total_amount, external_id=external_id
+        ))
+
+    Order.objects.bulk_create(
+        upserts, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['external_id'], update_fields=['client', 'order_date', 'total_amount']
+    )
+    return touched
+
+
+def append_orders(file, chunksize=CHUNK_SIZE, batch_size=BATCH_SIZE):
+    """Papildo esamus duomenis: klientai tapatinami pagal el. paštą, užsakymai – pagal external_id
+    arba natūralų raktą; perskaičiuojamos tik paliestų klientų suvestinės"""
+    result = IngestResult()
+    seen = Counter()
+    touched = set()
+    rows = 0
+
+    with transaction.atomic():
+        for chunk in read_chunks(file, chunksize):
+            chunk = validate_chunk(chunk)
+            if chunk.empty:
+                continue
+            rows += len(chunk)
+            chunk['external_id'] = order_keys(chunk, seen)
+            deduplicated = chunk.drop_duplicates('external_id', keep='last')
+            result.orders_skipped += len(chunk) - len(deduplicated)
+
+            client_ids, moved = _upsert_clients(deduplicated, result, batch_size)
+            deduplicated = deduplicated.assign(client_id=deduplicated['email'].map(client_ids))
+            touched |= moved | _upsert_orders(deduplicated, result, batch_size)
+
+        if not rows:
+            raise IngestError('❌ Failas yra tuščias.')
+
+        if touched:
+            refresh_client_aggregates(touched)
+        if touched or result.clients or result.clients_updated:
+            DatasetVersion.bump()
+
+    return result
@@ -0,0 +1,126 @@
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .backends import DateWindow
+from .clv import CLV_MODELS
+from .ingest import IngestError, append_orders, ingest_orders
+from .models import Job
+from .reports import PDF_REPORTS
+from .snapshot import refresh_snapshot_after_commit
+
+
+def get_jobs_root():
+    root = Path(settings.JOBS_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def enqueue_ingest(uploaded_file, user=None, append=False):
+    """Išsaugo įkeltą failą diske ir sukuria įkėlimo (arba papildymo) darbą"""
+    path = get_jobs_root() / f"{uuid.uuid4().hex}_{Path(uploaded_file.name).name}"
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    kind = Job.KIND_INGEST_APPEND if append else Job.KIND_INGEST
+    return Job.objects.create(kind=kind, input_file=str(path), created_by=user)
+
+
+REPORT_PARAMS = ['from', 'to', 'cohort_from', 'cohort_to', 'model']
+
+
+def enqueue_report(kind, user=None, params=None):
+    """params – puslapio GET parametrai; išsaugomi tik laikotarpio ir CLV modelio"""
+    if kind not in PDF_REPORTS:
+        raise ValueError(f"Nežinomas ataskaitos tipas: {kind}")
+    params = {key: params[key] for key in REPORT_PARAMS if params and params.get(key)}
+    return Job.objects.create(kind=kind, created_by=user, params=params)
+
+
+def report_arguments(job):
+    """Ataskaitos builder'io argumentai iš darbo parametrų – tie patys kaip sinchroniniame eksporte"""
+    arguments = {'window': DateWindow.from_query(job.params)}
+    if job.kind == Job.KIND_CLV_PDF and job.params.get('model') in CLV_MODELS:
+        arguments['model'] = job.params['model']
+    return arguments
+
+
+def claim_next_job():
+    """Pažymi seniausią laukiantį darbą kaip vykdomą; grąžina None, jei eilė tuščia"""
+    with transaction.atomic():
+        job_id = Job.objects.filter(status=Job.STATUS_QUEUED).order_by('created_at', 'pk').values_list('pk', flat=True).first()
+        if job_id is None:
+            return None
+        claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            started_at=timezone.now()
+        )
+    return job_id if claimed else claim_next_job()
+
+
+def fail_interrupted_jobs():
+    """Vykdytojo paleidimo metu RUNNING būsenos darbai liko nuo sustojusio proceso – jie pažymimi
+    nepavykusiais (įkėlimo transakcija jau atšaukta), o neapdoroti įkelti failai pašalinami"""
+    interrupted = Job.objects.filter(status=Job.STATUS_RUNNING)
+    for input_file in interrupted.exclude(input_file='').values_list('input_file', flat=True):
+        if os.path.exists(input_file):
+            os.remove(input_file)
+    return interrupted.update(
+        status=Job.STATUS_FAILED,
+        message='❌ Darbas nutrūko, nes vykdytojas buvo sustabdytas. Pateikite jį iš naujo.',
+        finished_at=timezone.now()
+    )
+
+
+def _run_ingest(job):
+    append = job.kind == Job.KIND_INGEST_APPEND
+    try:
+        with open(job.input_file, 'rb') as file:
+            result = append_orders(file) if append else ingest_orders(file)
+    finally:
+        os.remove(job.input_file)
+    # Duomenys jau įrašyti – kopijos klaida darbo nepažymi nepavykusiu, tik papildo pranešimą
+    warning = refresh_snapshot_after_commit()
+    if append:
+        message = (
+            f"✅ Klientai: nauji {result.clients}, atnaujinti {result.clients_updated}. "
+            f"Užsakymai: nauji {result.orders}, atnaujinti {result.orders_updated}, praleisti {result.orders_skipped}."
+        )
+    else:
+        message = f"✅ Įkelta klientų: {result.clients}, užsakymų: {result.orders}."
+        if result.orders_skipped:
+            message += f" Praleista pasikartojančių užsakymų: {result.orders_skipped}."
+    return f'{message} {warning}' if warning else message
+
+
+def _run_report(job):
+    builder, filename = PDF_REPORTS[job.kind]
+    path = get_jobs_root() / f"{job.pk}_{filename}"
+    with open(path, 'wb') as output:
+        builder(output, **report_arguments(job))
+    job.result_file = str(path)
+    return '✅ Ataskaita paruošta.'
+
+
+def run_job(job_id):
+    """Vykdo vieną darbą; kviečiama run_jobs komandos procesų telkinyje"""
+    job = Job.objects.get(pk=job_id)
+    try:
+        if job.kind in (Job.KIND_INGEST, Job.KIND_INGEST_APPEND):
+            job.message = _run_ingest(job)
+        else:
+            job.message = _run_report(job)
+        job.status = Job.STATUS_DONE
+    except IngestError as e:
+        job.status = Job.STATUS_FAILED
+        job.message = str(e)
+    except Exception as e:
+        job.status = Job.STATUS_FAILED
+        job.message = f'❌ Klaida vykdant darbą: {e}'
+    job.finished_at = timezone.now()
+    job.save()
+    return job.status
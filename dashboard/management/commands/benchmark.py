@@ -0,0 +1,228 @@
+import json
+import os
+import platform
+import threading
+import time
+from datetime import date, datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from dashboard.analytics import get_client_stats
+from dashboard.backends import ANALYTICS_BACKENDS
+from dashboard.caching import clear_cache
+from dashboard.clv import CLV_MODELS, build_clv_frame, calculate_clv, client_features, get_clv_model
+from dashboard.cohorts import build_cohort_matrices
+from dashboard.backends import cohort_activity_queryset, cohort_sizes_queryset
+from dashboard.models import Order
+from dashboard.profiling import current_rss
+from dashboard.rfm import calculate_rfm
+from dashboard.store import clear_order_store
+
+# Vidutiniškai ~6,9 užsakymo klientui su numatytuoju generate_data mišiniu
+ORDERS_PER_CLIENT = 6.93
+# Kohortų matricos tikslas: < 1 s 1M klientų ir 5 metų istorijai (--clients 1000000 --groups cohorts)
+COHORT_TARGET_SECONDS = 1.0
+
+VIEWS = [
+    '/rfm/', '/clv/', '/frequency/', '/cohort/', '/rfm/data/', '/clv/data/', '/frequency/data/',
+    '/charts/rfm-scatter/', '/charts/clv-histogram/', '/charts/frequency-distribution/',
+]
+EXPORTS = [
+    '/rfm/excel/', '/export/clv/excel/', '/export/frequency/excel/', '/export/cohort/excel/', '/export/report/excel/',
+    '/rfm/pdf/', '/export/clv/pdf/', '/export/frequency/pdf/', '/export/cohort/pdf/',
+    '/export_orders',
+]
+
+
+class PeakRSS:
+    """Fone kas kelias ms matuoja RSS ir įsimena didžiausią reikšmę bloko metu"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def analytics_steps():
+    stats = lambda: get_client_stats()
+    steps = [(f'client_stats:{name}', backend) for name, backend in ANALYTICS_BACKENDS.items()]
+    steps += [
+        ('calculate_rfm', lambda: calculate_rfm(stats())),
+        ('calculate_clv', lambda: calculate_clv(stats())),
+        ('cohort_matrices', lambda: build_cohort_matrices(cohort_activity_queryset(), cohort_sizes_queryset())),
+    ]
+    for name in CLV_MODELS:
+        steps.append((f'clv_model:{name}', lambda name=name: build_clv_frame(
+            client_features(stats()), get_clv_model(name).fit(client_features(stats()))
+        )))
+    return steps
+
+
+def cohort_steps(client):
+    return [
+        ('cohort_matrices', lambda: build_cohort_matrices(cohort_activity_queryset(), cohort_sizes_queryset())),
+        ('/cohort/', client_step(client, '/cohort/')),
+    ]
+
+
+def client_step(client, url):
+    def run():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url} grąžino {response.status_code}')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return len(body)
+    return run
+
+
+class Command(BaseCommand):
+    help = ('Išmatuoja analitikos funkcijų, puslapių ir eksportų laiką, didžiausią RSS ir užklausų skaičių '
+            'su sintetiniais duomenimis (įkeliami transakcijoje ir atšaukiami); rezultatai – JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, nargs='*', default=[10_000, 100_000, 1_000_000],
+                            help='Dydžiai užsakymų skaičiumi; be reikšmių – tik --clients dydžiai')
+        parser.add_argument('--clients', type=int, nargs='+', default=[],
+                            help='Papildomi dydžiai klientų skaičiumi, pvz. 1000000 kohortų tikslui patikrinti')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=1, help='Kartojimai; įrašomas greičiausias')
+        parser.add_argument('--groups', nargs='+', choices=['analytics', 'views', 'exports', 'cohorts'],
+                            default=['analytics', 'views', 'exports'])
+        parser.add_argument('--output', help='JSON failas rezultatams')
+        parser.add_argument('--compare', help='Ankstesnio paleidimo JSON palyginimui')
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Regresija, jei laikas ilgesnis nei threshold × ankstesnis')
+
+    def handle(self, *args, **options):
+        results = []
+        for orders in options['orders']:
+            results.extend(self._run_size(max(1, round(orders / ORDERS_PER_CLIENT)), orders, options))
+        for clients in options['clients']:
+            results.extend(self._run_size(clients, None, options))
+
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'analytics_backend': settings.ANALYTICS_BACKEND,
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(f'💾 Rezultatai įrašyti: {options["output"]}')
+
+        if options['compare']:
+            self._compare(results, options['compare'], options['threshold'])
+
+    def _run_size(self, clients, orders, options):
+        """orders – nominalus dydis rezultatams; None – įrašomas tikrasis sugeneruotų užsakymų skaičius"""
+        results = []
+        # Momentinė kopija neperrašoma sintetiniais duomenimis; async view'ų darbai vykdomi šioje
+        # gijoje, nes kitų gijų DB jungtys nemato neįvykdytos transakcijos duomenų.
+        # Testinis klientas siunčia Host: testserver, kurio produkcijos ALLOWED_HOSTS neturi
+        overrides = override_settings(
+            ANALYTICS_SNAPSHOT_DIR=None, ANALYTICS_THREADS=0, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        )
+        with overrides, transaction.atomic():
+            started = time.perf_counter()
+            call_command(
+                'generate_data', clients=clients, seed=options['seed'], until=date(2026, 1, 1),
+                stdout=open(os.devnull, 'w')
+            )
+            if orders is None:
+                orders = Order.objects.count()
+            self.stdout.write(f'🌱 ~{orders} užsakymų ({clients} klientų) paruošta per {time.perf_counter() - started:.1f} s')
+
+            client = TestClient()
+            client.force_login(get_user_model().objects.create_user('benchmark', password=None))
+
+            steps = []
+            if 'analytics' in options['groups']:
+                steps += [('analytics', name, step) for name, step in analytics_steps()]
+            if 'views' in options['groups']:
+                steps += [('views', url, client_step(client, url)) for url in VIEWS]
+            if 'exports' in options['groups']:
+                steps += [('exports', url, client_step(client, url)) for url in EXPORTS]
+            if 'cohorts' in options['groups']:
+                steps += [('cohorts', name, step) for name, step in cohort_steps(client)]
+
+            try:
+                for group, name, step in steps:
+                    result = self._measure(step, options['repeat'])
+                    result.update(orders=orders, clients=clients, group=group, name=name)
+                    results.append(result)
+                    self.stdout.write(
+                        f'  {group:<9} {name:<28} {result["seconds"]:>8.3f} s  '
+                        f'RSS +{result["peak_rss_mb"] - result["start_rss_mb"]:>7.1f} MB  {result["queries"]:>4} užkl.'
+                    )
+                    if group == 'cohorts' and result['seconds'] > COHORT_TARGET_SECONDS:
+                        self.stdout.write(self.style.WARNING(
+                            f'  ⚠️ {name}: viršytas {COHORT_TARGET_SECONDS:.0f} s kohortų tikslas'
+                        ))
+            finally:
+                transaction.set_rollback(True)
+
+        clear_cache()
+        clear_order_store()
+        return results
+
+    def _measure(self, step, repeat):
+        best = None
+        for _ in range(repeat):
+            # Kiekvienas matavimas – su tuščiu podėliu, t. y. šaltas kelias
+            clear_cache()
+            clear_order_store()
+            with CaptureQueriesContext(connection) as queries, PeakRSS() as rss:
+                started = time.perf_counter()
+                step()
+                elapsed = time.perf_counter() - started
+            result = {
+                'seconds': round(elapsed, 4),
+                'start_rss_mb': round(rss.start / 2 ** 20, 1),
+                'peak_rss_mb': round(rss.peak / 2 ** 20, 1),
+                'queries': len(queries),
+            }
+            if best is None or result['seconds'] < best['seconds']:
+                best = result
+        return best
+
+    def _compare(self, results, path, threshold):
+        with open(path, encoding='utf-8') as baseline_file:
+            baseline = {
+                (row['orders'], row['group'], row['name']): row for row in json.load(baseline_file)['results']
+            }
+        regressions = []
+        for row in results:
+            previous = baseline.get((row['orders'], row['group'], row['name']))
+            if previous is None or not previous['seconds']:
+                continue
+            ratio = row['seconds'] / previous['seconds']
+            if ratio > threshold:
+                regressions.append(f'{row["orders"]} {row["group"]} {row["name"]}: ×{ratio:.2f}')
+        if regressions:
+            raise CommandError('❌ Regresijos:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'✅ Regresijų nėra (riba ×{threshold})'))
@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+
+from dashboard.rfm import calculate_rfm
+
+
+def reference_calculate_rfm(stats):
+    """Ankstesnė (eilutėmis per apply) calculate_rfm versija palyginimui"""
+    snapshot_date = stats['last_order_date'].max() + timedelta(days=1)
+
+    rfm = stats[['client_id', 'first_name', 'last_name', 'email']].copy()
+    rfm['Recency'] = stats['last_order_date'].apply(lambda x: (snapshot_date - x).days)
+    rfm['Frequency'] = stats['order_count']
+    rfm['Monetary'] = stats['total_spent']
+    rfm = rfm.reset_index(drop=True)
+
+    def safe_qcut(series, q, labels):
+        try:
+            bins = pd.qcut(series, q=q, duplicates='drop')
+            levels = bins.cat.categories.size
+            return pd.qcut(series, q=levels, labels=labels[-levels:]).astype(int)
+        except ValueError:
+            return pd.Series([2] * len(series))
+
+    rfm['R'] = safe_qcut(rfm['Recency'], q=3, labels=[3, 2, 1])
+    rfm['F'] = safe_qcut(rfm['Frequency'].rank(method='first'), q=3, labels=[1, 2, 3])
+    rfm['M'] = safe_qcut(rfm['Monetary'], q=3, labels=[1, 2, 3])
+
+    rfm['RFM_Score'] = rfm['R'].astype(str) + rfm['F'].astype(str) + rfm['M'].astype(str)
+
+    def segment(row):
+        if row['RFM_Score'] == '333':
+            return 'Lojalūs'
+        elif row['R'] == 3 and row['F'] <= 2:
+            return 'Nauji'
+        elif row['R'] == 1 and row['F'] == 1:
+            return 'Rizikingi'
+        elif row['M'] == 3:
+            return 'Vertingi'
+        else:
+            return 'Kiti'
+
+    rfm['Segmentas'] = rfm.apply(segment, axis=1)
+    return rfm
+
+
+def synthetic_client_stats(clients, seed=42):
+    rng = np.random.default_rng(seed)
+    order_count = rng.geometric(0.25, clients)
+    last_order_date = pd.Timestamp('2025-06-30') - pd.to_timedelta(rng.integers(0, 1800, clients), unit='D')
+    return pd.DataFrame({
+        'client_id': np.arange(1, clients + 1),
+        'first_name': 'Vardas',
+        'last_name': 'Pavardė',
+        'email': [f'klientas{i}@example.com' for i in range(clients)],
+        'order_count': order_count,
+        'first_order_date': last_order_date - pd.to_timedelta(order_count * 30, unit='D'),
+        'last_order_date': last_order_date,
+        'total_spent': (order_count * rng.gamma(2.0, 120.0, clients)).round(2),
+    })
+
+
+class Command(BaseCommand):
+    help = 'Palygina vektorizuotą calculate_rfm su ankstesne apply versija (rezultatai ir greitis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        for clients in options['clients']:
+            stats = synthetic_client_stats(clients, options['seed'])
+
+            started = time.perf_counter()
+            expected = reference_calculate_rfm(stats)
+            reference_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            result = calculate_rfm(stats)
+            vectorized_time = time.perf_counter() - started
+
+            pd.testing.assert_frame_equal(result, expected)
+
+            self.stdout.write(
+                f'{clients:>9} klientų: apply {reference_time:.2f} s, '
+                f'vektorizuota {vectorized_time:.2f} s, '
+                f'pagreitis ×{reference_time / vectorized_time:.1f} (rezultatai sutampa)'
+            )
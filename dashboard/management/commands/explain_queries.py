@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from dashboard.backends import DateWindow, client_aggregate_queryset, monthly_revenue_queryset, window_aggregate_queryset
+from dashboard.models import ClientStats, Order
+
+
+def hot_queries():
+    """Analitikos užklausos ir indeksai (bent vienas iš jų), kuriuos jos turi naudoti"""
+    last_date = Order.objects.aggregate(last=Max('order_date'))['last'] or date.today()
+    window_start = last_date - timedelta(days=90)
+    client_id = Order.objects.values_list('client_id', flat=True).first() or 0
+
+    return [
+        ('Agregacija pagal klientą', client_aggregate_queryset(), ('order_client_date_amount_idx',)),
+        ('Mėnesinės pajamos (suvestinės)', monthly_revenue_queryset(), ()),
+        ('Laikotarpio suvestinės', window_aggregate_queryset(DateWindow(start=window_start.replace(day=1))),
+         ('monthly_month_client_idx', 'unique_client_month', 'sqlite_autoindex_dashboard_clientmonthlystats')),
+        ('Datų intervalas', Order.objects.filter(order_date__gte=window_start).values('order_date', 'total_amount'),
+         ('order_date_amount_idx',)),
+        ('Kliento užsakymai pagal datą', Order.objects.filter(client_id=client_id).order_by('order_date')
+         .values('order_date', 'total_amount'), ('order_client_date_amount_idx',)),
+        ('ClientStats skaitymas', ClientStats.objects.order_by('client_id').values('client_id', 'order_count'), ()),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Išspausdina EXPLAIN planus analitikos užklausoms ir patikrina, ar naudojami indeksai'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true', help='Grąžinti klaidą, jei indeksas nenaudojamas')
+
+    def handle(self, *args, **options):
+        missing = []
+        for name, queryset, expected_indexes in hot_queries():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+            self.stdout.write(plan)
+
+            if expected_indexes and not any(index in plan for index in expected_indexes):
+                missing.append(name)
+                self.stdout.write(self.style.WARNING(f'⚠️ Nenaudojamas nė vienas iš indeksų: {", ".join(expected_indexes)}'))
+            self.stdout.write('')
+
+        if missing and options['strict']:
+            raise CommandError(f'Prarastas indeksų naudojimas: {", ".join(missing)}')
@@ -1,72 +1,168 @@
-from django.core.management.base import BaseCommand
-from dashboard.models import Client, Order
-from faker import Faker
-import random
-from datetime import datetime, timedelta
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from dashboard.models import (
+    Client, ClientMonthlyStats, ClientStats, CohortMonthlyStats, DatasetVersion, Order, rebuild_client_aggregates,
+)
+from dashboard.snapshot import refresh_snapshot_after_commit
+from dashboard.synthetic import CLIENT_TYPES, GeneratorConfig, generate_batch, iso_dates, name_pool
+
+EMAIL_DOMAINS = np.array(['gmail.com', 'yahoo.com', 'inbox.lt', 'one.lt', 'example.lt'], dtype=object)
+INSERT_CHUNK_SIZE = 20_000
+
+
+def _order_indexes(action):
+    """Antrinių Order indeksų SQL: masinio įkėlimo metu jie pašalinami ir sukuriami iš naujo pabaigoje"""
+    editor = connection.schema_editor()
+    quote = connection.ops.quote_name
+    for index in Order._meta.indexes:
+        if action == 'remove':
+            yield editor.sql_delete_index % {'name': quote(index.name), 'table': quote(Order._meta.db_table)}
+        else:
+            yield str(index.create_sql(Order, editor))
+
+
+def _execute(statements):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _insert(model, columns, rows):
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(connection.ops.quote_name(column) for column in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = f'INSERT INTO {table} ({names}) VALUES ({placeholders})'
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            cursor.executemany(sql, rows[start:start + INSERT_CHUNK_SIZE])
 
 
 class Command(BaseCommand):
-    help = 'Sugeneruoja klientus ir užsakymus su realistišku elgesiu'
+    help = 'Sugeneruoja klientus ir užsakymus su realistišku elgesiu (vektorizuotai, atkuriamai pagal sėklą)'
 
-    def handle(self, *args, **kwargs):
-        fake = Faker('lt_LT')
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--start', type=date.fromisoformat, default=date(2020, 1, 1),
+                            help='Anksčiausia pirmojo pirkimo data (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, default=date(2025, 6, 30),
+                            help='Vėliausia pirmojo pirkimo data (YYYY-MM-DD)')
+        parser.add_argument('--mix', type=float, nargs=len(CLIENT_TYPES),
+                            default=[client_type.weight for client_type in CLIENT_TYPES],
+                            metavar=tuple(client_type.name for client_type in CLIENT_TYPES),
+                            help='Klientų tipų svoriai')
+        parser.add_argument('--until', type=date.fromisoformat, default=date.today(),
+                            help='Vėliausia užsakymo data (numatytoji – šiandien; nurodykite, kad rezultatas būtų atkuriamas)')
+        parser.add_argument('--active-days', type=int, default=1800)
+        parser.add_argument('--name-pool', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=20_000, help='Klientų skaičius vienoje dalyje')
+        parser.add_argument('--workers', type=int, default=1, help='Procesai dalims generuoti')
 
-        Order.objects.all().delete()
-        Client.objects.all().delete()
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['batch_size'] < 1:
+            raise CommandError('Klientų ir dalies dydis turi būti teigiami.')
+        if options['start'] > options['end']:
+            raise CommandError('--start negali būti vėlesnė už --end.')
 
-        client_count = 500
+        config = GeneratorConfig(
+            seed=options['seed'],
+            start=np.datetime64(options['start'], 'D'),
+            end=np.datetime64(options['end'], 'D'),
+            until=np.datetime64(options['until'], 'D'),
+            client_types=tuple(
+                client_type.__class__(**{**client_type.__dict__, 'weight': weight})
+                for client_type, weight in zip(CLIENT_TYPES, options['mix'])
+            ),
+            active_days=options['active_days'],
+            name_pool_size=options['name_pool'],
+        )
+        first_names, last_names = name_pool(options['seed'], options['name_pool'])
 
-        for _ in range(client_count):
-            first_order_date = fake.date_between_dates(
-                date_start=datetime(2020, 1, 1),
-                date_end=datetime(2025, 6, 30)
-            )
+        batch_size = options['batch_size']
+        batches = [
+            (index, 1 + start, min(batch_size, options['clients'] - start))
+            for index, start in enumerate(range(0, options['clients'], batch_size))
+        ]
 
-            client_type = random.choices(
-                ['loyal', 'regular', 'one_timer'],
-                weights=[0.2, 0.5, 0.3],
-                k=1
-            )[0]
+        started = time.perf_counter()
+        clients = orders = 0
+        with transaction.atomic():
+            _execute(_order_indexes('remove'))
+            Order.objects.all().delete()
+            ClientStats.objects.all().delete()
+            ClientMonthlyStats.objects.all().delete()
+            CohortMonthlyStats.objects.all().delete()
+            Client.objects.all().delete()
+            cleared = time.perf_counter() - started
 
-            if client_type == 'loyal':
-                num_orders = random.randint(10, 30)
-            elif client_type == 'regular':
-                num_orders = random.randint(3, 7)
+            generate = partial(generate_batch, config)
+            if options['workers'] > 1:
+                executor = ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('spawn'))
+                results = executor.map(generate, *zip(*batches))
             else:
-                num_orders = random.randint(1, 2)
-
-            client = Client.objects.create(
-                first_name=fake.first_name(),
-                last_name=fake.last_name(),
-                email=fake.unique.email(),
-                created_at=datetime.combine(first_order_date, datetime.min.time())
-            )
-
-            for _ in range(num_orders):
-                order_date_start = first_order_date
-                order_date_end = min(
-                    first_order_date + timedelta(days=1800),
-                    datetime.today().date()
-                )
-                if order_date_start > order_date_end:
-                    order_date_end = order_date_start
-
-                order_date = fake.date_between_dates(
-                    date_start=order_date_start,
-                    date_end=order_date_end
-                )
-
-                if client_type == 'loyal':
-                    total_amount = round(random.uniform(100, 800), 2)
-                elif client_type == 'regular':
-                    total_amount = round(random.uniform(50, 500), 2)
-                else:
-                    total_amount = round(random.uniform(30, 400), 2)
-
-                Order.objects.create(
-                    client=client,
-                    order_date=order_date,
-                    total_amount=total_amount
-                )
+                executor = None
+                results = map(generate, *zip(*batches))
+
+            try:
+                for batch in results:
+                    self._write_batch(batch, first_names, last_names, options['seed'])
+                    clients += len(batch.client_ids)
+                    orders += len(batch.order_client_ids)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+            inserted = time.perf_counter() - started - cleared
+            _execute(_order_indexes('create'))
+            _execute(connection.ops.sequence_reset_sql(no_style(), [Client, Order]))
+            written = time.perf_counter() - started
 
+            rebuild_client_aggregates()
+            DatasetVersion.bump()
+        warning = refresh_snapshot_after_commit()
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+
+        self.stdout.write(
+            f'📦 {clients} klientų, {orders} užsakymų įrašyta per {inserted:.2f} s ({orders / inserted:,.0f} užsakymų/s); '
+            f'valymas {cleared:.2f} s, indeksai {written - cleared - inserted:.2f} s, '
+            f'suvestinės {time.perf_counter() - started - written:.2f} s'
+        )
         self.stdout.write(self.style.SUCCESS('✅ Duomenys su klientų elgesiu sėkmingai sugeneruoti.'))
+
+    def _write_batch(self, batch, first_names, last_names, seed):
+        client_ids = batch.client_ids.tolist()
+        emails = [
+            f'klientas{client_id}@{domain}'
+            for client_id, domain in zip(client_ids, EMAIL_DOMAINS[batch.client_ids % len(EMAIL_DOMAINS)])
+        ]
+        created_days = iso_dates(batch.created_days).tolist()
+        _insert(Client, ['id', 'first_name', 'last_name', 'email', 'created_at', 'cohort_month'], list(zip(
+            client_ids,
+            first_names[batch.first_name_rows].tolist(),
+            last_names[batch.last_name_rows].tolist(),
+            emails,
+            [f'{day} 00:00:00' for day in created_days],
+            [f'{day[:8]}01' for day in created_days],
+        )))
+
+        order_client_ids = batch.order_client_ids.tolist()
+        external_ids = [
+            f'g{seed}:{client_id}:{number}'
+            for client_id, number in zip(order_client_ids, batch.order_numbers.tolist())
+        ]
+        _insert(Order, ['client_id', 'order_date', 'total_amount', 'external_id'], list(zip(
+            order_client_ids,
+            iso_dates(batch.order_days).tolist(),
+            (batch.order_cents / 100).tolist(),
+            external_ids,
+        )))
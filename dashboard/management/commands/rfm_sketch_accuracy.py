@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from dashboard.analytics import get_client_stats
+from dashboard.rfm import calculate_rfm
+from dashboard.sketches import DEFAULT_K, RFMSketches, sketch_bins
+
+from .benchmark_rfm import synthetic_client_stats
+
+TERTILES = np.array([1 / 3, 2 / 3])
+
+
+def boundary_rank_error(values, bins):
+    """Didžiausias |tikrasis ribos rangas – tikslinis kvantilis| per tertilių ribas"""
+    values = np.sort(np.asarray(values, dtype=float))
+    if len(bins) != len(TERTILES):
+        return float('nan')
+    lower = np.searchsorted(values, bins, side='left') / len(values)
+    upper = np.searchsorted(values, bins, side='right') / len(values)
+    # Jei riba patenka į pasikartojančių reikšmių bloką, tinka bet kuris rangas bloko viduje
+    error = np.maximum(np.maximum(lower - TERTILES, TERTILES - upper), 0)
+    return float(error.max())
+
+
+class Command(BaseCommand):
+    help = 'Palygina KLL eskizų RFM balus su tiksliu pd.qcut (ribų rango paklaida ir balų sutapimas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--k', type=int, nargs='+', default=[DEFAULT_K])
+        parser.add_argument('--batches', type=int, default=16, help='Į kiek dalių skaidomi duomenys (eskizai sujungiami)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--database', action='store_true', help='Naudoti esamus klientus vietoj sintetinių')
+
+    def handle(self, *args, **options):
+        if options['database']:
+            datasets = [('DB', get_client_stats())]
+        else:
+            datasets = [(clients, synthetic_client_stats(clients, options['seed'])) for clients in options['clients']]
+
+        for label, stats in datasets:
+            started = time.perf_counter()
+            exact = calculate_rfm(stats)
+            exact_time = time.perf_counter() - started
+
+            for k in options['k']:
+                started = time.perf_counter()
+                sketches = RFMSketches(k)
+                for part in np.array_split(np.arange(len(stats)), options['batches']):
+                    sketches.merge(RFMSketches.from_stats(stats.iloc[part], k=k))
+                result = calculate_rfm(stats, sketches=sketches)
+                sketch_time = time.perf_counter() - started
+
+                last_order_days = stats['last_order_date'].to_numpy('datetime64[D]').astype(np.int64)
+                errors = {
+                    'R': boundary_rank_error(last_order_days, sketch_bins(sketches.last_order, 3)),
+                    'F': boundary_rank_error(stats['order_count'], sketch_bins(sketches.frequency, 3)),
+                    'M': boundary_rank_error(stats['total_spent'], sketch_bins(sketches.monetary, 3)),
+                }
+                agreement = {
+                    column: (result[column] == exact[column]).mean() * 100
+                    for column in ('R', 'F', 'M', 'Segmentas')
+                }
+
+                self.stdout.write(
+                    f'{label:>9} klientų, k={k}: eskizo dydis {sketches.size} reikšmių; '
+                    f'ribų rango paklaida ' + ', '.join(f'{c} {e:.4f}' for c, e in errors.items()) + '; '
+                    f'sutapimas ' + ', '.join(f'{c} {a:.1f} %' for c, a in agreement.items()) + '; '
+                    f'qcut {exact_time:.2f} s, eskizai {sketch_time:.2f} s'
+                )
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from dashboard.jobs import claim_next_job, fail_interrupted_jobs, run_job
+from dashboard.models import Job
+
+
+class Command(BaseCommand):
+    help = ('Vykdo fone užsakytus įkėlimo ir ataskaitų darbus procesų telkinyje; paleidžiamas vienas '
+            'vykdytojas – jo paleidimo metu vis dar vykdomi darbai pažymimi nepavykusiais')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Baigti, kai eilė ištuštėja')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        poll_interval = options['poll_interval']
+
+        interrupted = fail_interrupted_jobs()
+        if interrupted:
+            self.stdout.write(f'⚠️ Nutrūkę darbai pažymėti nepavykusiais: {interrupted}')
+
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(f'🔄 Darbų vykdytojas paleistas ({workers} procesai).')
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+            running = {}
+            while True:
+                while len(running) < workers:
+                    job_id = claim_next_job()
+                    if job_id is None:
+                        break
+                    running[pool.submit(run_job, job_id)] = job_id
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        status = Job.STATUS_FAILED
+                        Job.objects.filter(pk=job_id).update(
+                            status=status,
+                            message=f'❌ Darbo procesas nutrūko: {e}',
+                            finished_at=timezone.now()
+                        )
+                    self.stdout.write(f'Darbas #{job_id}: {status}')
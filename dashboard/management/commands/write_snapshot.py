@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.snapshot import get_snapshot_dir, read_snapshot, write_snapshot
+from dashboard.store import get_order_store
+
+
+class Command(BaseCommand):
+    help = 'Įrašo užsakymų ir klientų Arrow (pasirinktinai ir Parquet) momentinę kopiją analitikai'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Katalogas (numatytasis – ANALYTICS_SNAPSHOT_DIR)')
+        parser.add_argument('--parquet', action='store_true', help='Papildomai įrašyti Parquet failus')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or get_snapshot_dir()
+        if directory is None:
+            raise CommandError('Nenurodytas katalogas: naudokite --dir arba ANALYTICS_SNAPSHOT_DIR.')
+
+        store = get_order_store()
+        try:
+            paths = write_snapshot(store, directory, parquet=options['parquet'])
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        snapshot = read_snapshot(directory, version=store.version)
+        elapsed = time.perf_counter() - started
+        if snapshot is None or len(snapshot) != len(store):
+            raise CommandError('Įrašytos kopijos nepavyko perskaityti.')
+
+        for path in paths:
+            self.stdout.write(f'📦 {path} ({path.stat().st_size / 1024:.0f} KB)')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Kopija įrašyta: {len(store)} užsakymų, karta {store.version}; atvaizdavimas {elapsed * 1000:.1f} ms'
+        ))
@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def build_client_stats(apps, schema_editor):
+    Order = apps.get_model('dashboard', 'Order')
+    ClientStats = apps.get_model('dashboard', 'ClientStats')
+    rows = Order.objects.values('client_id').annotate(
+        order_count=Count('id'),
+        first_order_date=Min('order_date'),
+        last_order_date=Max('order_date'),
+        total_spent=Sum('total_amount'),
+    ).order_by()
+    ClientStats.objects.bulk_create([ClientStats(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_client_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientStats',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='dashboard.client')),
+                ('order_count', models.PositiveIntegerField()),
+                ('first_order_date', models.DateField()),
+                ('last_order_date', models.DateField()),
+                ('total_spent', models.DecimalField(decimal_places=2, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(build_client_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_monthly_stats(apps, schema_editor):
+    Order = apps.get_model('dashboard', 'Order')
+    ClientMonthlyStats = apps.get_model('dashboard', 'ClientMonthlyStats')
+    rows = Order.objects.annotate(month=TruncMonth('order_date')).values('client_id', 'month').annotate(
+        order_count=Count('id'),
+        first_order_date=Min('order_date'),
+        last_order_date=Max('order_date'),
+        revenue=Sum('total_amount'),
+    ).order_by()
+    ClientMonthlyStats.objects.bulk_create([ClientMonthlyStats(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('order_count', models.PositiveIntegerField()),
+                ('first_order_date', models.DateField()),
+                ('last_order_date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='dashboard.client')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('client', 'month'), name='unique_client_month')],
+                'indexes': [models.Index(fields=['month', 'client'], name='monthly_month_client_idx')],
+            },
+        ),
+        migrations.RunPython(build_monthly_stats, migrations.RunPython.noop),
+    ]
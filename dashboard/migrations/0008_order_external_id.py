@@ -0,0 +1,46 @@
+import hashlib
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def natural_order_key(email, order_date, amount, occurrence):
+    # Kopija iš dashboard.ingest.natural_order_key – migracijos neturi priklausyti nuo programos kodo
+    base = f'{email}|{order_date:%Y-%m-%d}|{amount:.2f}|{occurrence}'
+    return 'n:' + hashlib.sha1(base.encode()).hexdigest()
+
+
+def fill_external_ids(apps, schema_editor):
+    Order = apps.get_model('dashboard', 'Order')
+    seen = Counter()
+    batch = []
+    rows = Order.objects.order_by('pk').values_list('pk', 'client__email', 'order_date', 'total_amount')
+    for pk, email, order_date, total_amount in rows.iterator(chunk_size=2000):
+        key = (email, order_date, float(total_amount))
+        batch.append(Order(pk=pk, external_id=natural_order_key(*key, seen[key])))
+        seen[key] += 1
+        if len(batch) >= 2000:
+            Order.objects.bulk_update(batch, ['external_id'])
+            batch = []
+    Order.objects.bulk_update(batch, ['external_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_clientmonthlystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_external_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('ingest', 'Duomenų įkėlimas'), ('ingest_append', 'Duomenų papildymas'), ('rfm_pdf', 'RFM PDF ataskaita'), ('clv_pdf', 'CLV PDF ataskaita'), ('frequency_pdf', 'Purchase Frequency PDF ataskaita')], max_length=20),
+        ),
+    ]
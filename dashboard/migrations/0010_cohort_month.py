@@ -0,0 +1,86 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+
+def acquisition_month(created_at):
+    # Kopija iš dashboard.models.acquisition_month – migracijos neturi priklausyti nuo programos kodo
+    if timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return created_at.date().replace(day=1)
+
+
+def fill_cohort_months(apps, schema_editor):
+    Client = apps.get_model('dashboard', 'Client')
+    ClientMonthlyStats = apps.get_model('dashboard', 'ClientMonthlyStats')
+    batch = []
+    for pk, created_at in Client.objects.order_by('pk').values_list('pk', 'created_at').iterator(chunk_size=2000):
+        batch.append(Client(pk=pk, cohort_month=acquisition_month(created_at)))
+        if len(batch) >= 2000:
+            Client.objects.bulk_update(batch, ['cohort_month'])
+            batch = []
+    Client.objects.bulk_update(batch, ['cohort_month'])
+
+    ClientMonthlyStats.objects.update(cohort_month=Subquery(
+        Client.objects.filter(pk=OuterRef('client_id')).values('cohort_month')[:1]
+    ))
+
+
+def fill_cohort_stats(apps, schema_editor):
+    ClientMonthlyStats = apps.get_model('dashboard', 'ClientMonthlyStats')
+    CohortMonthlyStats = apps.get_model('dashboard', 'CohortMonthlyStats')
+    CohortMonthlyStats.objects.bulk_create(
+        [CohortMonthlyStats(**row) for row in ClientMonthlyStats.objects.values('cohort_month', 'month').annotate(
+            clients=Count('id'), revenue=Sum('revenue')
+        ).order_by()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_job_params'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='cohort_month',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='clientmonthlystats',
+            name='cohort_month',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(fill_cohort_months, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='client',
+            name='cohort_month',
+            field=models.DateField(db_index=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='clientmonthlystats',
+            name='cohort_month',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='clientmonthlystats',
+            index=models.Index(fields=['cohort_month', 'month', 'client', 'revenue'], name='monthly_cohort_month_idx'),
+        ),
+        migrations.CreateModel(
+            name='CohortMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort_month', models.DateField()),
+                ('month', models.DateField()),
+                ('clients', models.PositiveIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=16)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cohort_month', 'month'), name='unique_cohort_month')],
+            },
+        ),
+        migrations.RunPython(fill_cohort_stats, migrations.RunPython.noop),
+    ]
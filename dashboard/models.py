@@ -1,19 +1,311 @@
-from django.db import models
+import uuid
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 
+def acquisition_month(created_at):
+    """Kliento kohorta: created_at mėnesio pirmoji diena (pagal TIME_ZONE, kaip TruncMonth)"""
+    if timezone.is_aware(created_at):
+        created_at = timezone.localtime(created_at)
+    return created_at.date().replace(day=1)
+
+
 class Client(models.Model):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     email = models.EmailField(unique=True)
     created_at = models.DateTimeField()
+    # acquisition_month(created_at) – kohortų užklausos grupuoja pagal paprastą indeksuotą stulpelį,
+    # o ne pagal TruncMonth kiekvienai eilutei; masiniai įrašymai jį užpildo patys
+    cohort_month = models.DateField(db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        self.cohort_month = acquisition_month(self.created_at)
+        super().save(*args, **kwargs)
+
 class Order(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     order_date = models.DateField()
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Užsakymo ID iš šaltinio sistemos arba natūralaus rakto maiša (žr. ingest.order_keys)
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Datų intervalo filtrai ir mėnesinės pajamos skaitomos vien iš indekso
+            models.Index(fields=['order_date', 'total_amount'], name='order_date_amount_idx'),
+            # Agregacija pagal klientą (COUNT/MIN/MAX/SUM) ir kliento užsakymai pagal datą
+            models.Index(fields=['client', 'order_date', 'total_amount'], name='order_client_date_amount_idx'),
+        ]
 
     def __str__(self):
         return f"{self.client} – {self.total_amount} €"
+
+    def save(self, *args, **kwargs):
+        previous_client_id = None
+        if self.pk is not None:
+            previous_client_id = Order.objects.filter(pk=self.pk).values_list('client_id', flat=True).first()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_client_aggregates({self.client_id, previous_client_id} - {None})
+            DatasetVersion.bump()
+
+    def delete(self, *args, **kwargs):
+        client_id = self.client_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_client_aggregates([client_id])
+            DatasetVersion.bump()
+        return result
+
+
+class ClientAggregateManager(models.Manager):
+    """Bendras suvestinių lentelių palaikymas: `_aggregate` apibrėžia grupavimą"""
+    BATCH_SIZE = 500
+
+    def _aggregate(self, orders):
+        raise NotImplementedError
+
+    def _insert_aggregates(self, orders):
+        """INSERT ... SELECT: suvestinės eilutės neperkeliamos per Python; `_aggregate` stulpelių
+        pavadinimai sutampa su modelio stulpeliais"""
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(field.column) for field in self.model._meta.concrete_fields
+            if not isinstance(field, models.AutoField)
+        )
+        sql, params = self._aggregate(orders).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(self.model._meta.db_table)} ({columns}) '
+                f'SELECT {columns} FROM ({sql}) aggregated',
+                params
+            )
+
+    def refresh(self, client_ids):
+        """Perskaičiuoja nurodytų klientų suvestines (naudojama po pavienių Order įrašų)"""
+        client_ids = list(client_ids)
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(client_ids), self.BATCH_SIZE):
+                batch = client_ids[start:start + self.BATCH_SIZE]
+                self.filter(client_id__in=batch).delete()
+                self._insert_aggregates(Order.objects.filter(client_id__in=batch))
+
+    def rebuild(self):
+        """Perskaičiuoja visų klientų suvestines (naudojama po masinio įkėlimo)"""
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self._insert_aggregates(Order.objects.all())
+
+
+class ClientStatsManager(ClientAggregateManager):
+
+    def _aggregate(self, orders):
+        return orders.values('client_id').annotate(
+            order_count=Count('id'),
+            first_order_date=Min('order_date'),
+            last_order_date=Max('order_date'),
+            total_spent=Sum('total_amount'),
+        ).order_by()
+
+
+class ClientMonthlyStatsManager(ClientAggregateManager):
+
+    def _aggregate(self, orders):
+        return orders.annotate(
+            month=TruncMonth('order_date'), cohort_month=F('client__cohort_month')
+        ).values('client_id', 'month', 'cohort_month').annotate(
+            order_count=Count('id'),
+            first_order_date=Min('order_date'),
+            last_order_date=Max('order_date'),
+            revenue=Sum('total_amount'),
+        ).order_by()
+
+
+class CohortMonthlyStatsManager(ClientAggregateManager):
+    """Kohortų suvestinės skaičiuojamos iš ClientMonthlyStats, ne iš užsakymų"""
+
+    def _aggregate(self, monthly):
+        return monthly.values('cohort_month', 'month').annotate(
+            clients=Count('id'),
+            revenue=Sum('revenue'),
+        ).order_by()
+
+    def refresh(self, cohort_months):
+        """Perskaičiuoja nurodytų kohortų eilutes (po klientų mėnesinių suvestinių atnaujinimo)"""
+        cohort_months = list(cohort_months)
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(cohort_months), self.BATCH_SIZE):
+                batch = cohort_months[start:start + self.BATCH_SIZE]
+                self.filter(cohort_month__in=batch).delete()
+                self._insert_aggregates(ClientMonthlyStats.objects.filter(cohort_month__in=batch))
+
+    def rebuild(self):
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self._insert_aggregates(ClientMonthlyStats.objects.all())
+
+
+def client_cohort_months(client_ids):
+    """Kohortos, kurioms priklauso nurodytų klientų mėnesinės suvestinės"""
+    client_ids = list(client_ids)
+    cohort_months = set()
+    for start in range(0, len(client_ids), ClientAggregateManager.BATCH_SIZE):
+        cohort_months.update(ClientMonthlyStats.objects.filter(
+            client_id__in=client_ids[start:start + ClientAggregateManager.BATCH_SIZE]
+        ).values_list('cohort_month', flat=True).distinct())
+    return cohort_months
+
+
+def refresh_client_aggregates(client_ids):
+    """Atnaujina nurodytų klientų ClientStats, mėnesines suvestines ir jų senų bei naujų kohortų eilutes"""
+    client_ids = list(client_ids)
+    cohort_months = client_cohort_months(client_ids)
+    ClientStats.objects.refresh(client_ids)
+    ClientMonthlyStats.objects.refresh(client_ids)
+    CohortMonthlyStats.objects.refresh(cohort_months | client_cohort_months(client_ids))
+
+
+def rebuild_client_aggregates():
+    ClientStats.objects.rebuild()
+    ClientMonthlyStats.objects.rebuild()
+    CohortMonthlyStats.objects.rebuild()
+
+
+class ClientStats(models.Model):
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    order_count = models.PositiveIntegerField()
+    first_order_date = models.DateField()
+    last_order_date = models.DateField()
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2)
+
+    objects = ClientStatsManager()
+
+    def __str__(self):
+        return f"{self.client} – {self.order_count} užs., {self.total_spent} €"
+
+
+class ClientMonthlyStats(models.Model):
+    """Kliento užsakymai ir pajamos per kalendorinį mėnesį (month – pirmoji mėnesio diena)"""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='monthly_stats')
+    month = models.DateField()
+    # Client.cohort_month kopija: CohortMonthlyStats perskaičiuojama vien iš šios lentelės indekso
+    cohort_month = models.DateField()
+    order_count = models.PositiveIntegerField()
+    first_order_date = models.DateField()
+    last_order_date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    objects = ClientMonthlyStatsManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'month'], name='unique_client_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month', 'client'], name='monthly_month_client_idx'),
+            models.Index(fields=['cohort_month', 'month', 'client', 'revenue'], name='monthly_cohort_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client} – {self.month:%Y-%m}: {self.revenue} €"
+
+
+class CohortMonthlyStats(models.Model):
+    """Kohortos (įsigijimo mėnesio) aktyvūs klientai ir pajamos per kalendorinį mėnesį –
+    kohortų matrica skaitoma iš kelių tūkstančių eilučių, o ne iš visų ClientMonthlyStats"""
+    cohort_month = models.DateField()
+    month = models.DateField()
+    clients = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=16, decimal_places=2)
+
+    objects = CohortMonthlyStatsManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cohort_month', 'month'], name='unique_cohort_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.cohort_month:%Y-%m} – {self.month:%Y-%m}: {self.clients} klientų, {self.revenue} €"
+
+
+class DatasetVersion(models.Model):
+    """Vienos eilutės lentelė: duomenų rinkinio kartos numeris analitikos podėlio raktams"""
+    generation = models.PositiveBigIntegerField(default=0)
+    token = models.CharField(max_length=32, default='')
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def current(cls):
+        version, _ = cls.objects.get_or_create(pk=1)
+        return version
+
+    @classmethod
+    def bump(cls):
+        cls.objects.get_or_create(pk=1)
+        cls.objects.filter(pk=1).update(
+            generation=F('generation') + 1,
+            token=uuid.uuid4().hex,
+            updated_at=timezone.now()
+        )
+
+    @property
+    def cache_key(self):
+        return f"{self.generation}-{self.token}"
+
+    def __str__(self):
+        return f"Duomenų karta {self.generation}"
+
+
+class Job(models.Model):
+    """Fone (run_jobs komanda) vykdomas įkėlimo arba ataskaitos darbas"""
+    KIND_INGEST = 'ingest'
+    KIND_INGEST_APPEND = 'ingest_append'
+    KIND_RFM_PDF = 'rfm_pdf'
+    KIND_CLV_PDF = 'clv_pdf'
+    KIND_FREQUENCY_PDF = 'frequency_pdf'
+    KIND_CHOICES = [
+        (KIND_INGEST, 'Duomenų įkėlimas'),
+        (KIND_INGEST_APPEND, 'Duomenų papildymas'),
+        (KIND_RFM_PDF, 'RFM PDF ataskaita'),
+        (KIND_CLV_PDF, 'CLV PDF ataskaita'),
+        (KIND_FREQUENCY_PDF, 'Purchase Frequency PDF ataskaita'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Laukia eilėje'),
+        (STATUS_RUNNING, 'Vykdomas'),
+        (STATUS_DONE, 'Baigtas'),
+        (STATUS_FAILED, 'Nepavyko'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    input_file = models.CharField(max_length=255, blank=True)
+    # Ataskaitos parametrai iš puslapio užklausos: laikotarpis (from/to/cohort_from/cohort_to) ir CLV modelis
+    params = models.JSONField(default=dict, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_kind_display()} – {self.get_status_display()}"
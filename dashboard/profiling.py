@@ -0,0 +1,289 @@
+"""Užklausų profiliavimas: etapų laikai, SQL užklausos, atmintis.
+
+`ProfilingMiddleware` kiekvienai užklausai renka `@instrument` pažymėtų funkcijų laikus,
+SQL užklausų skaičių ir trukmę bei RSS pokytį, grąžina juos `Server-Timing` antraštėje ir
+kaupia proceso metrikas, kurias `metrics_view` pateikia Prometheus tekstiniu formatu.
+Su `?_profile=cprofile` (arba `pyinstrument`) vietoje atsakymo grąžinama profilio ataskaita.
+Middleware veikia ir ASGI (async) režimu; tada SQL užklausos skaičiuojamos tose gijose, kuriose
+jos vykdomos (žr. `profiled_queries` ir concurrency.run_blocking), o profilio ataskaitos nepalaikomos.
+"""
+import contextvars
+import cProfile
+import functools
+import io
+import os
+import pstats
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Užklausos trukmės histogramos ribos sekundėmis
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+def current_rss():
+    """Dabartinis proceso RSS baitais (Linux /proc; kitur – didžiausias iki šiol)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.start_rss = current_rss()
+        self.stages = defaultdict(lambda: [0, 0.0])
+        self.queries = 0
+        self.query_seconds = 0.0
+        # Async view'ai etapus ir užklausas gali vykdyti keliose gijose vienu metu
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            stage = self.stages[name]
+            stage[0] += 1
+            stage[1] += seconds
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.queries += 1
+                self.query_seconds += time.perf_counter() - started
+
+    def server_timing(self, total):
+        # Antraštės reikšmė turi būti ASCII
+        entries = [f'{name};dur={seconds * 1000:.1f};desc="n={count}"' for name, (count, seconds) in self.stages.items()]
+        entries.append(f'db;dur={self.query_seconds * 1000:.1f};desc="n={self.queries}"')
+        entries.append(f'mem;desc="RSS {(current_rss() - self.start_rss) / 2 ** 20:+.1f} MB"')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+class Metrics:
+    """Proceso metrikos; kiekvienas darbinis procesas turi savo rinkinį"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.request_seconds = defaultdict(float)
+        self.request_buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.stages = defaultdict(lambda: [0, 0.0])
+        self.queries = defaultdict(int)
+        self.query_seconds = defaultdict(float)
+
+    def observe_request(self, view, status, seconds, profile):
+        with self._lock:
+            self.requests[view, status] += 1
+            self.request_seconds[view] += seconds
+            buckets = self.request_buckets[view]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            self.queries[view] += profile.queries
+            self.query_seconds[view] += profile.query_seconds
+
+    def observe_stage(self, name, seconds):
+        with self._lock:
+            stage = self.stages[name]
+            stage[0] += 1
+            stage[1] += seconds
+
+    def render(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{labels} {value}' for labels, value in samples)
+
+        with self._lock:
+            metric('dashboard_requests_total', 'counter', 'Užklausų skaičius', [
+                (f'{{view="{view}",status="{status}"}}', count) for (view, status), count in self.requests.items()
+            ])
+            totals = defaultdict(int)
+            for (view, _), count in self.requests.items():
+                totals[view] += count
+            histogram = []
+            for view, buckets in self.request_buckets.items():
+                histogram += [(f'_bucket{{view="{view}",le="{bound}"}}', count) for bound, count in zip(BUCKETS, buckets)]
+                histogram += [
+                    (f'_bucket{{view="{view}",le="+Inf"}}', totals[view]),
+                    (f'_sum{{view="{view}"}}', round(self.request_seconds[view], 6)),
+                    (f'_count{{view="{view}"}}', totals[view]),
+                ]
+            metric('dashboard_request_seconds', 'histogram', 'Užklausos trukmė', histogram)
+            metric('dashboard_db_queries_total', 'counter', 'SQL užklausos pagal view', [
+                (f'{{view="{view}"}}', count) for view, count in self.queries.items()
+            ])
+            metric('dashboard_db_seconds_total', 'counter', 'SQL užklausų trukmė pagal view', [
+                (f'{{view="{view}"}}', round(seconds, 6)) for view, seconds in self.query_seconds.items()
+            ])
+            metric('dashboard_stage_seconds_total', 'counter', 'Instrumentuotų etapų trukmė', [
+                (f'{{stage="{name}"}}', round(seconds, 6)) for name, (_, seconds) in self.stages.items()
+            ])
+            metric('dashboard_stage_calls_total', 'counter', 'Instrumentuotų etapų iškvietimai', [
+                (f'{{stage="{name}"}}', count) for name, (count, _) in self.stages.items()
+            ])
+        metric('process_resident_memory_bytes', 'gauge', 'Proceso RSS', [('', current_rss())])
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def instrument(name=None):
+    """Dekoratorius: funkcijos trukmė įrašoma į dabartinės užklausos profilį ir proceso metrikas"""
+    def decorator(func):
+        stage = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                profile = _current.get()
+                if profile is not None:
+                    profile.add_stage(stage, elapsed)
+                metrics.observe_stage(stage, elapsed)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiled_queries():
+    """Dabartinės gijos DB jungčių užklausos įskaitomos į dabartinės užklausos profilį"""
+    profile = _current.get()
+    with ExitStack() as stack:
+        if profile is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile.query_wrapper))
+        yield
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else 'unresolved'
+
+
+def _capture_mode(request):
+    mode = request.GET.get('_profile')
+    user = getattr(request, 'user', None)
+    if mode and settings.PROFILING_CAPTURE and (settings.DEBUG or (user is not None and user.is_staff)):
+        return mode
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def _pyinstrument_report(get_response, request):
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return HttpResponse('pyinstrument neįdiegtas (pip install pyinstrument).', status=501, content_type='text/plain')
+    profiler = Profiler()
+    profiler.start()
+    get_response(request)
+    profiler.stop()
+    return HttpResponse(profiler.output_html())
+
+
+def _cprofile(get_response, request):
+    profiler = cProfile.Profile()
+    response = profiler.runcall(get_response, request)
+    return profiler, response
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        if settings.PROFILING_TRACEMALLOC and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        try:
+            with profiled_queries():
+                response = self._call_view(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile)
+
+    def _finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        timing = profile.server_timing(total)
+        if tracemalloc.is_tracing():
+            timing += f', alloc;desc="peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MB"'
+        response['Server-Timing'] = timing
+        metrics.observe_request(_view_name(request), response.status_code, total, profile)
+        return response
+
+    def _call_view(self, request):
+        mode = _capture_mode(request)
+        if mode == 'pyinstrument':
+            return _pyinstrument_report(self.get_response, request)
+        if mode == 'sample':
+            profiler, response = _cprofile(self.get_response, request)
+            directory = Path(settings.PROFILING_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(directory / f'{time.strftime("%Y%m%d-%H%M%S")}-{_view_name(request)}-{os.getpid()}.prof')
+            return response
+        if mode:
+            profiler, _ = _cprofile(self.get_response, request)
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(60)
+            return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
+        return self.get_response(request)
+
+
+def metrics_view(request):
+    """Prometheus formato metrikos; prieinamos administratoriams ir METRICS_ALLOWED_IPS adresams"""
+    user = getattr(request, 'user', None)
+    if not (user is not None and user.is_staff) and request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,182 @@
+"""PDF ataskaitos.
+
+Didelės lentelės rašomos dalimis: `table_chunks` kuria po ROWS_PER_TABLE eilučių `LongTable`
+su pasikartojančia antrašte, o `build_streaming` jas perduoda ReportLab po vieną, todėl atmintyje
+laikoma tik dabartinė dalis, o ne visa kelių šimtų tūkstančių eilučių lentelė.
+Prieš lentelę pridedami suvestinės puslapiai, skaičiuojami iš jau sukauptų analitikos rezultatų.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+from reportlab.platypus import (
+    BaseDocTemplate, Frame, LongTable, PageBreak, PageTemplate, Paragraph, Spacer, TableStyle,
+)
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+
+from .analytics import get_clv_frame, get_cohort_matrices, get_frequency_frame, get_rfm_frame
+from .profiling import instrument
+
+COHORT_PDF_PERIODS = 18
+# Vienos LongTable dalies eilučių skaičius (~10 A4 puslapių)
+ROWS_PER_TABLE = 500
+FREQUENCY_BUCKETS = [0, 1, 2, 5, 10, np.inf]
+FREQUENCY_LABELS = ['1', '2', '3–5', '6–10', '11+']
+
+
+@functools.lru_cache(maxsize=None)
+def table_style(font_size=None):
+    """Bendras lentelių stilius; kuriamas vieną kartą kiekvienam šrifto dydžiui"""
+    style = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]
+    if font_size:
+        style.append(('FONTSIZE', (0, 0), (-1, -1), font_size))
+    return TableStyle(style)
+
+
+def table_chunks(frame, font_size=None, rows=ROWS_PER_TABLE):
+    """Lentelė dalimis; kiekvienos dalies eilutės paverčiamos sąrašais tik tada, kai jos reikia"""
+    header = [str(column) for column in frame.columns]
+    style = table_style(font_size)
+    for start in range(0, max(len(frame), 1), rows):
+        data = [header] + frame.iloc[start:start + rows].values.tolist()
+        yield LongTable(data, repeatRows=1, style=style)
+
+
+def build_streaming(output, flowables, pagesize=A4):
+    """Kaip SimpleDocTemplate.build, tik elementai imami iš iteratoriaus po vieną"""
+    doc = BaseDocTemplate(output, pagesize=pagesize, pageCompression=1)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+    doc.addPageTemplates([PageTemplate(id='Page', frames=frame, pagesize=pagesize)])
+    doc._startBuild()
+    doc.canv._doctemplate = doc
+    try:
+        for flowable in flowables:
+            pending = [flowable]
+            while pending:
+                doc.clean_hanging()
+                doc.handle_flowable(pending)
+    finally:
+        del doc.canv._doctemplate
+    doc._endBuild()
+
+
+def summary_flowables(summary):
+    """Suvestinės puslapiai: [(pavadinimas, nedidelė lentelė), ...] ir puslapio lūžis"""
+    styles = getSampleStyleSheet()
+    for subtitle, frame in summary:
+        yield Paragraph(subtitle, styles['Heading2'])
+        yield from table_chunks(frame)
+        yield Spacer(1, 12)
+    if summary:
+        yield PageBreak()
+
+
+@instrument()
+def build_table_pdf(output, title, frame, pagesize=A4, summary=()):
+    styles = getSampleStyleSheet()
+
+    def flowables():
+        yield Paragraph(title, styles['Title'])
+        yield Spacer(1, 12)
+        yield from summary_flowables(summary)
+        yield from table_chunks(frame)
+
+    build_streaming(output, flowables(), pagesize)
+
+
+@instrument()
+def build_cohort_pdf(output, window=None):
+    """Kohortų matricos – stulpeliai skaidomi į kelias lenteles, kad tilptų gulsčiame A4"""
+    retention, revenue = get_cohort_matrices(window)
+    styles = getSampleStyleSheet()
+
+    def flowables():
+        yield Paragraph("AITI Group – Kohortų analizės ataskaita", styles['Title'])
+        yield Spacer(1, 12)
+        for subtitle, matrix in (("Išlaikymas, %", retention), ("Pajamos, €", revenue)):
+            matrix = matrix.reset_index()
+            fixed, periods = matrix.columns[:2].tolist(), matrix.columns[2:].tolist()
+            for start in range(0, max(len(periods), 1), COHORT_PDF_PERIODS):
+                part = periods[start:start + COHORT_PDF_PERIODS]
+                label = f"{subtitle} (mėn. {part[0]}–{part[-1]})" if part else subtitle
+                yield Paragraph(label, styles['Heading2'])
+                yield from table_chunks(matrix[fixed + part], font_size=6)
+                yield Spacer(1, 12)
+
+    build_streaming(output, flowables(), landscape(A4))
+
+
+def rfm_summary(rfm):
+    """Segmentų suvestinė: klientai, dalis, vidutinės R/F/M reikšmės ir pajamos"""
+    grouped = rfm.groupby('Segmentas', sort=False)
+    summary = pd.DataFrame({
+        'Klientai': grouped.size(),
+        'Dalis, %': (grouped.size() / max(len(rfm), 1) * 100).round(1),
+        'Recency (vid.)': grouped['Recency'].mean().round(1),
+        'Frequency (vid.)': grouped['Frequency'].mean().round(2),
+        'Monetary (iš viso)': grouped['Monetary'].sum().round(2),
+    }).sort_values('Klientai', ascending=False)
+    return [("Segmentų suvestinė", summary.reset_index())]
+
+
+def clv_summary(clv):
+    values = clv['CLV'].to_numpy(dtype=float)
+    top = np.sort(values)[::-1][:max(len(values) // 10, 1)] if len(values) else values
+    totals = pd.DataFrame({
+        'Klientai': [len(values)],
+        'CLV iš viso': [round(values.sum(), 2)],
+        'Vidurkis': [round(values.mean(), 2) if len(values) else 0],
+        'Mediana': [round(float(np.median(values)), 2) if len(values) else 0],
+        'Top 10 % dalis, %': [round(top.sum() / values.sum() * 100, 1) if values.sum() else 0],
+    })
+    levels = [0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+    quantiles = pd.DataFrame({
+        'Kvantilis': [f'{level:.0%}' for level in levels],
+        'CLV': np.round(np.quantile(values, levels), 2) if len(values) else [0] * len(levels),
+    })
+    return [("CLV suvestinė", totals), ("CLV pasiskirstymas", quantiles)]
+
+
+def frequency_summary(frequency):
+    """Klientų ir pajamų pasiskirstymas pagal užsakymų skaičių"""
+    buckets = pd.cut(frequency['order_count'], FREQUENCY_BUCKETS, labels=FREQUENCY_LABELS)
+    grouped = frequency.groupby(buckets, observed=False)
+    summary = pd.DataFrame({
+        'Klientai': grouped.size(),
+        'Pajamos': grouped['total_spent'].sum().round(2),
+    })
+    summary.index.name = 'Užsakymai'
+    return [("Pirkimų dažnio pasiskirstymas", summary.reset_index())]
+
+
+def build_rfm_pdf(output, window=None):
+    rfm = get_rfm_frame(window)
+    build_table_pdf(output, "AITI Group – RFM analizės ataskaita", rfm, summary=rfm_summary(rfm))
+
+
+def build_clv_pdf(output, model=None, window=None):
+    clv = get_clv_frame(model, window)
+    build_table_pdf(output, "AITI Group – CLV analizės ataskaita", clv, summary=clv_summary(clv))
+
+
+def build_frequency_pdf(output, window=None):
+    frequency = get_frequency_frame(window)
+    build_table_pdf(
+        output, "AITI Group – Purchase Frequency analizės ataskaita",
+        frequency.drop(columns='total_spent'), summary=frequency_summary(frequency)
+    )
+
+
+PDF_REPORTS = {
+    'rfm_pdf': (build_rfm_pdf, 'rfm_analize.pdf'),
+    'clv_pdf': (build_clv_pdf, 'clv_analize.pdf'),
+    'frequency_pdf': (build_frequency_pdf, 'purchase_frequency.pdf'),
+}
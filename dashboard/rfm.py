@@ -1,46 +1,86 @@
+import operator
+
+import numpy as np
 import pandas as pd
 from datetime import timedelta
 
-def calculate_rfm(df):
-    snapshot_date = df['order_date'].max() + timedelta(days=1)
-
-    rfm = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'order_date': lambda x: (snapshot_date - x.max()).days,
-        'id': 'count',
-        'total_amount': 'sum'
-    }).reset_index()
-
-    rfm.columns = ['client_id', 'first_name', 'last_name', 'email', 'Recency', 'Frequency', 'Monetary']
-
-    def safe_qcut(series, q, labels):
-        try:
-            bins = pd.qcut(series, q=q, duplicates='drop')
-            levels = bins.cat.categories.size
-            return pd.qcut(series, q=levels, labels=labels[-levels:]).astype(int)
-        except ValueError:
-            return pd.Series([2] * len(series))
-
-    rfm['R'] = safe_qcut(rfm['Recency'], q=3, labels=[3, 2, 1])
-    rfm['F'] = safe_qcut(rfm['Frequency'].rank(method='first'), q=3, labels=[1, 2, 3])
-    rfm['M'] = safe_qcut(rfm['Monetary'], q=3, labels=[1, 2, 3])
-
-    rfm['RFM_Score'] = rfm['R'].astype(str) + rfm['F'].astype(str) + rfm['M'].astype(str)
-
-    def segment(row):
-        if row['RFM_Score'] == '333':
-            return 'Lojalūs'
-        elif row['R'] == 3 and row['F'] <= 2:
-            return 'Nauji'
-        elif row['R'] == 1 and row['F'] == 1:
-            return 'Rizikingi'
-        elif row['M'] == 3:
-            return 'Vertingi'
-        else:
-            return 'Kiti'
-
-    rfm['Segmentas'] = rfm.apply(segment, axis=1)
-    return rfm
+from .profiling import instrument
+from .sketches import sketch_bins
+
+# Segmentų taisyklės tikrinamos iš eilės; pirmoji tenkinama taisyklė nusako segmentą.
+SEGMENT_RULES = [
+    ('Lojalūs', {'R': ('==', 3), 'F': ('==', 3), 'M': ('==', 3)}),
+    ('Nauji', {'R': ('==', 3), 'F': ('<=', 2)}),
+    ('Rizikingi', {'R': ('==', 1), 'F': ('==', 1)}),
+    ('Vertingi', {'M': ('==', 3)}),
+]
+DEFAULT_SEGMENT = 'Kiti'
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def score_quantiles(series, labels):
+    """Tas pats kaip pd.qcut(duplicates='drop') ir pakartotinis qcut su likusiu lygių skaičiumi,
+    tačiau įprastu atveju (visi kvantiliai skirtingi) ribos skaičiuojamos tik vieną kartą"""
+    try:
+        codes, bins = pd.qcut(series, q=len(labels), labels=False, retbins=True, duplicates='drop')
+        levels = len(bins) - 1
+        if levels < 1:
+            raise ValueError('Nepakanka skirtingų reikšmių')
+        if levels != len(labels):
+            codes = pd.qcut(series, q=levels, labels=False)
+        return np.asarray(labels[-levels:])[np.asarray(codes, dtype=int)]
+    except ValueError:
+        return np.full(len(series), 2)
+
+
+def score_sketch(values, sketch, labels):
+    """Balai pagal eskizo ribas: reikšmė ≤ pirmos ribos gauna pirmą lygį ir t. t."""
+    bins = sketch_bins(sketch, len(labels))
+    if not sketch.n:
+        return np.full(len(values), 2)
+    levels = len(bins) + 1
+    return np.asarray(labels[-levels:])[np.searchsorted(bins, np.asarray(values, dtype=float), side='left')]
 
+
+def assign_segments(rfm, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+    conditions = []
+    for _, criteria in rules:
+        condition = np.ones(len(rfm), dtype=bool)
+        for column, (op, value) in criteria.items():
+            condition &= OPERATORS[op](rfm[column].to_numpy(), value)
+        conditions.append(condition)
+    return np.select(conditions, [name for name, _ in rules], default=default)
+
+
+@instrument()
+def calculate_rfm(stats, rules=SEGMENT_RULES, sketches=None):
+    """RFM balai; jei perduoti `sketches` (RFMSketches), tertilių ribos imamos iš eskizų, o ne iš pd.qcut"""
+    snapshot_date = stats['last_order_date'].max() + timedelta(days=1)
+
+    rfm = stats[['client_id', 'first_name', 'last_name', 'email']].copy()
+    rfm['Recency'] = (snapshot_date - stats['last_order_date']).dt.days
+    rfm['Frequency'] = stats['order_count']
+    rfm['Monetary'] = stats['total_spent']
+    rfm = rfm.reset_index(drop=True)
+
+    if sketches is None:
+        rfm['R'] = score_quantiles(rfm['Recency'], labels=[3, 2, 1])
+        rfm['F'] = score_quantiles(rfm['Frequency'].rank(method='first'), labels=[1, 2, 3])
+        rfm['M'] = score_quantiles(rfm['Monetary'], labels=[1, 2, 3])
+    else:
+        last_order_days = stats['last_order_date'].to_numpy('datetime64[D]').astype(np.int64)
+        rfm['R'] = score_sketch(last_order_days, sketches.last_order, labels=[1, 2, 3])
+        rfm['F'] = score_sketch(rfm['Frequency'], sketches.frequency, labels=[1, 2, 3])
+        rfm['M'] = score_sketch(rfm['Monetary'], sketches.monetary, labels=[1, 2, 3])
+
+    rfm['RFM_Score'] = (rfm['R'] * 100 + rfm['F'] * 10 + rfm['M']).astype(str)
+    rfm['Segmentas'] = assign_segments(rfm, rules)
+    return rfm
@@ -0,0 +1,138 @@
+"""Arrow IPC užsakymų ir klientų momentinė kopija.
+
+Failai rašomi nesuspausti, vienu įrašų paketu, todėl skaitant jie tik atvaizduojami į atmintį
+(mmap) – skaitiniai stulpeliai tampa NumPy masyvais be kopijavimo. Tie patys failai tinka
+ir analitikai už Django ribų (pyarrow.ipc.open_file / pandas.read_feather).
+Papildomai galima įrašyti Parquet kopijas. pyarrow yra neprivalomas.
+"""
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .store import OrderStore, get_order_store
+
+ORDERS_FILE = 'orders.arrow'
+CLIENTS_FILE = 'clients.arrow'
+VERSION_KEY = b'dataset_version'
+
+logger = logging.getLogger(__name__)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError('Momentinėms kopijoms reikalingas pyarrow paketas (pip install pyarrow).') from e
+    return pyarrow
+
+
+def get_snapshot_dir():
+    directory = getattr(settings, 'ANALYTICS_SNAPSHOT_DIR', None)
+    return Path(directory) if directory else None
+
+
+def _write_table(pa, table, path):
+    temporary = path.with_suffix('.tmp')
+    with pa.OSFile(str(temporary), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+    # Skaitytojai mato arba seną, arba pilnai įrašytą failą
+    os.replace(temporary, path)
+
+
+def write_snapshot(store, directory=None, parquet=False):
+    """Įrašo saugyklą į katalogą; grąžina įrašytų failų kelius"""
+    pa = _require_pyarrow()
+    directory = Path(directory or get_snapshot_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    metadata = {VERSION_KEY: store.version.encode()}
+
+    orders = pa.table({
+        'id': store.order_ids,
+        'client_id': store.client_ids,
+        'day': store.days,
+        'cents': store.cents,
+        'client_row': store.client_rows,
+    }).replace_schema_metadata(metadata)
+    clients = pa.table({
+        'id': store.client_table_ids,
+        'first_name': pa.array(store.first_names, type=pa.string()),
+        'last_name': pa.array(store.last_names, type=pa.string()),
+        'email': pa.array(store.emails, type=pa.string()),
+    }).replace_schema_metadata(metadata)
+
+    paths = [directory / ORDERS_FILE, directory / CLIENTS_FILE]
+    # Klientai rašomi pirmi: užsakymų failas su nauja versija reiškia, kad kopija pilna
+    _write_table(pa, clients, paths[1])
+    _write_table(pa, orders, paths[0])
+
+    if parquet:
+        import pyarrow.parquet as pq
+        for table, path in ((orders, directory / 'orders.parquet'), (clients, directory / 'clients.parquet')):
+            pq.write_table(table, path)
+            paths.append(path)
+    return paths
+
+
+def _read_table(pa, path):
+    reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+    return reader.read_all(), (reader.schema.metadata or {}).get(VERSION_KEY, b'').decode()
+
+
+def _column(table, name):
+    return table.column(name).combine_chunks().to_numpy(zero_copy_only=True)
+
+
+def read_snapshot(directory=None, version=None):
+    """Atvaizduoja kopiją į atmintį; grąžina None, jei jos nėra, ji kitos versijos arba nėra pyarrow"""
+    directory = directory or get_snapshot_dir()
+    if directory is None:
+        return None
+    directory = Path(directory)
+    try:
+        pa = _require_pyarrow()
+        orders, orders_version = _read_table(pa, directory / ORDERS_FILE)
+        clients, clients_version = _read_table(pa, directory / CLIENTS_FILE)
+    except (ImportError, FileNotFoundError):
+        return None
+    if orders_version != clients_version or (version is not None and orders_version != version):
+        return None
+
+    return OrderStore(
+        version=orders_version,
+        order_ids=_column(orders, 'id'),
+        client_ids=_column(orders, 'client_id'),
+        days=_column(orders, 'day'),
+        cents=_column(orders, 'cents'),
+        client_table_ids=_column(clients, 'id'),
+        first_names=np.asarray(clients.column('first_name').to_pylist(), dtype=object),
+        last_names=np.asarray(clients.column('last_name').to_pylist(), dtype=object),
+        emails=np.asarray(clients.column('email').to_pylist(), dtype=object),
+        client_rows=_column(orders, 'client_row'),
+    )
+
+
+def refresh_snapshot():
+    """Perrašo kopiją dabartiniais duomenimis, jei kopijos katalogas nustatytas ir yra pyarrow"""
+    if get_snapshot_dir() is None:
+        return None
+    try:
+        _require_pyarrow()
+    except ImportError:
+        return None
+    return write_snapshot(get_order_store())
+
+
+def refresh_snapshot_after_commit():
+    """refresh_snapshot() po jau įrašytų duomenų: klaida registruojama ir grąžinamas įspėjimo tekstas
+    (None – pavyko). Pasenusi kopija nenaudojama, nes read_snapshot tikrina duomenų versiją"""
+    try:
+        refresh_snapshot()
+    except Exception as e:
+        logger.exception('Nepavyko atnaujinti momentinės kopijos')
+        return f'⚠️ Duomenys įrašyti, tačiau momentinė kopija neatnaujinta: {e}'
+    return None
@@ -0,0 +1,148 @@
+"""Procesui bendra stulpelinė užsakymų saugykla.
+
+Užsakymai laikomi NumPy masyvuose (id, client_id, diena nuo epochos int32, suma centais int64),
+o klientų vardai ir el. paštai – atskiroje klientų lentelėje, po vieną eilutę klientui.
+Saugykla įkeliama pirmą kartą jos prireikus (iš Arrow kopijos, jei ji aktuali – žr. snapshot.py)
+ir perkraunama tik pasikeitus DatasetVersion, todėl užklausos skaito tuos pačius masyvus,
+o ne kuria DataFrame iš ORM žodynų.
+"""
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .models import Client, DatasetVersion, Order
+
+LOAD_CHUNK_SIZE = 50_000
+
+
+@dataclass(frozen=True)
+class OrderStore:
+    version: str
+    order_ids: np.ndarray
+    client_ids: np.ndarray
+    days: np.ndarray
+    cents: np.ndarray
+    # Klientų lentelė, surikiuota pagal id; client_rows – kiekvieno užsakymo kliento eilutė joje
+    client_table_ids: np.ndarray
+    first_names: np.ndarray
+    last_names: np.ndarray
+    emails: np.ndarray
+    client_rows: np.ndarray
+
+    def __len__(self):
+        return len(self.order_ids)
+
+    @property
+    def nbytes(self):
+        strings = sum(len(value) for column in (self.first_names, self.last_names, self.emails) for value in column)
+        arrays = (
+            self.order_ids, self.client_ids, self.days, self.cents,
+            self.client_table_ids, self.first_names, self.last_names, self.emails, self.client_rows,
+        )
+        return strings + sum(array.nbytes for array in arrays)
+
+    @classmethod
+    def from_columns(cls, version, order_ids, client_ids, days, cents,
+                     client_table_ids, first_names, last_names, emails):
+        order = np.argsort(client_table_ids, kind='stable')
+        client_table_ids = np.asarray(client_table_ids, dtype=np.int64)[order]
+        client_ids = np.asarray(client_ids, dtype=np.int64)
+        return cls(
+            version=version,
+            order_ids=np.asarray(order_ids, dtype=np.int64),
+            client_ids=client_ids,
+            days=np.asarray(days, dtype=np.int32),
+            cents=np.asarray(cents, dtype=np.int64),
+            client_table_ids=client_table_ids,
+            first_names=np.asarray(first_names, dtype=object)[order],
+            last_names=np.asarray(last_names, dtype=object)[order],
+            emails=np.asarray(emails, dtype=object)[order],
+            client_rows=np.searchsorted(client_table_ids, client_ids).astype(np.int32),
+        )
+
+    @classmethod
+    def load(cls, version):
+        """Skaito Order ir Client lenteles dalimis per values_list (be modelių ir žodynų)"""
+        order_ids, client_ids, days, cents = [], [], [], []
+        rows = Order.objects.order_by().values_list('id', 'client_id', 'order_date', 'total_amount')
+        chunk = []
+        for row in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            chunk.append(row)
+            if len(chunk) == LOAD_CHUNK_SIZE:
+                _append_orders(chunk, order_ids, client_ids, days, cents)
+                chunk = []
+        if chunk:
+            _append_orders(chunk, order_ids, client_ids, days, cents)
+
+        clients = list(Client.objects.order_by('id').values_list('id', 'first_name', 'last_name', 'email'))
+        client_table_ids, first_names, last_names, emails = zip(*clients) if clients else ((), (), (), ())
+        return cls.from_columns(
+            version,
+            _concat(order_ids, np.int64), _concat(client_ids, np.int64),
+            _concat(days, np.int32), _concat(cents, np.int64),
+            np.array(client_table_ids, dtype=np.int64), first_names, last_names, emails,
+        )
+
+    def order_dates(self):
+        return pd.to_datetime(self.days.astype('datetime64[D]'))
+
+    def amounts(self):
+        return self.cents / 100
+
+    def client_names(self, client_ids):
+        """Vardai ir el. paštai nurodytiems klientams (client_ids turi būti saugykloje)"""
+        rows = np.searchsorted(self.client_table_ids, client_ids)
+        return self.first_names[rows], self.last_names[rows], self.emails[rows]
+
+    def to_dataframe(self):
+        """Užsakymų lentelė su klientų laukais; eilutės nurodo tuos pačius eilučių objektus"""
+        return pd.DataFrame({
+            'id': self.order_ids,
+            'client_id': self.client_ids,
+            'first_name': self.first_names[self.client_rows],
+            'last_name': self.last_names[self.client_rows],
+            'email': self.emails[self.client_rows],
+            'order_date': self.order_dates(),
+            'total_amount': self.amounts(),
+        })
+
+
+def _append_orders(chunk, order_ids, client_ids, days, cents):
+    ids, clients, dates, amounts = zip(*chunk)
+    order_ids.append(np.array(ids, dtype=np.int64))
+    client_ids.append(np.array(clients, dtype=np.int64))
+    days.append(np.array(dates, dtype='datetime64[D]').astype(np.int32))
+    cents.append(np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64))
+
+
+def _concat(parts, dtype):
+    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_order_store():
+    """Grąžina dabartinės duomenų kartos saugyklą; pasikeitus kartai perkrauna vieną kartą –
+    iš Arrow kopijos (mmap), jei ji tos pačios kartos, kitaip iš duomenų bazės"""
+    from .snapshot import read_snapshot
+
+    global _store
+    version = DatasetVersion.current().cache_key
+    store = _store
+    if store is not None and store.version == version:
+        return store
+    with _lock:
+        if _store is None or _store.version != version:
+            _store = read_snapshot(version=version) or OrderStore.load(version)
+        return _store
+
+
+def clear_order_store():
+    """Atlaisvina saugyklą (pvz. po atšaukto sintetinių duomenų įkėlimo)"""
+    global _store
+    with _lock:
+        _store = None
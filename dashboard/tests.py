@@ -0,0 +1,560 @@
+import importlib.util
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from collections import Counter
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import caching, jobs
+from .backends import (
+    ANALYTICS_BACKENDS, DateWindow, _stats_dataframe, client_aggregate_queryset, cohort_activity_queryset,
+    cohort_sizes_queryset, get_client_stats_dataframe,
+)
+from .cohorts import build_cohort_matrices
+from .clv import CLV_MODELS
+from .clv.probabilistic import BGNBDGammaGammaCLV
+from .ingest import (
+    IngestError, append_orders, ingest_orders, natural_order_key, order_keys, read_chunks, validate_chunk,
+)
+from .management.commands.benchmark import (
+    EXPORTS as BENCHMARK_EXPORTS, VIEWS as BENCHMARK_VIEWS, analytics_steps, cohort_steps,
+)
+from .models import Client, ClientMonthlyStats, CohortMonthlyStats, DatasetVersion, Job, Order
+from .parallel import MIN_PARALLEL_ROWS, aggregate_partition, parallel_aggregate
+from .rfm import calculate_rfm
+from .views import CHART_SERIES
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        caching.clear_cache()
+        self.builds = []
+
+    def build(self, name):
+        return caching.get_cached(name, lambda: self.builds.append(name) or object())
+
+    def test_same_object_within_generation(self):
+        self.assertIs(self.build('rfm'), self.build('rfm'))
+        self.assertEqual(self.builds, ['rfm'])
+
+    def test_new_generation_drops_previous_results(self):
+        self.build('rfm')
+        self.build('rfm@2024-01:::')
+        DatasetVersion.bump()
+        self.build('clv')
+        self.assertEqual(set(caching._results), {'clv'})
+        self.assertFalse(caching._windowed)
+
+    @override_settings(ANALYTICS_WINDOW_CACHE_ENTRIES=2)
+    def test_window_entries_are_bounded(self):
+        for name in ['rfm', 'rfm@2024-01:::', 'rfm@2024-02:::', 'rfm@2024-01:::', 'rfm@2024-03:::']:
+            self.build(name)
+        self.assertEqual(list(caching._windowed), ['rfm@2024-01:::', 'rfm@2024-03:::'])
+        self.build('rfm@2024-02:::')
+        self.build('rfm')
+        self.assertEqual(self.builds, ['rfm', 'rfm@2024-01:::', 'rfm@2024-02:::', 'rfm@2024-03:::', 'rfm@2024-02:::'])
+
+
+class OrderKeysTests(SimpleTestCase):
+    def chunk(self, external_ids, index):
+        return pd.DataFrame({
+            'email': ['a@example.com'] * len(external_ids),
+            'order_date': pd.to_datetime(['2024-01-05'] * len(external_ids)),
+            'total_amount': [10.0] * len(external_ids),
+            'external_id': external_ids,
+        }, index=index)
+
+    def test_numbering_continues_across_chunks_for_natural_keys_only(self):
+        seen = Counter()
+        first = order_keys(self.chunk(['X-1', None, ' '], index=[0, 1, 2]), seen)
+        second = order_keys(self.chunk([None, 'X-2'], index=[3, 4]), seen)
+
+        natural = [natural_order_key('a@example.com', date(2024, 1, 5), 10.0, occurrence) for occurrence in range(2)]
+        self.assertEqual(first.tolist(), ['X-1', natural[0], natural[1]])
+        self.assertEqual(second.tolist(), [natural_order_key('a@example.com', date(2024, 1, 5), 10.0, 2), 'X-2'])
+        self.assertEqual(second.index.tolist(), [3, 4])
+        self.assertEqual(seen, Counter({('a@example.com', date(2024, 1, 5), 10.0): 3}))
+
+
+class ParallelAggregateTests(SimpleTestCase):
+    def test_parallel_path_matches_single_partition(self):
+        rng = np.random.default_rng(0)
+        rows = MIN_PARALLEL_ROWS + 50_000
+        client_ids = rng.integers(1, 20_000, size=rows).astype(np.int64)
+        # Kaip OrderStore: dienos int32, sumos int64
+        days = rng.integers(18_000, 20_000, size=rows).astype(np.int32)
+        cents = rng.integers(100, 100_000, size=rows).astype(np.int64)
+
+        expected = aggregate_partition(client_ids, days, cents)
+        result = parallel_aggregate(client_ids, days, cents, workers=2)
+
+        self.assertEqual(len(result), len(expected))
+        for column, expected_column in zip(result, expected):
+            np.testing.assert_array_equal(column, expected_column)
+
+
+@override_settings(ANALYTICS_SNAPSHOT_DIR=None, ANALYTICS_WORKERS=2)
+class BackendParityTests(TestCase):
+    """Visi analitikos backend'ai ir laikotarpio suvestinės turi sutapti su agregacija tiesiai iš užsakymų"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for number, (created, orders) in enumerate([
+            (datetime(2024, 1, 5), [(date(2024, 1, 5), '10.10'), (date(2024, 2, 14), '20.25'),
+                                    (date(2024, 3, 31), '5.50'), (date(2024, 4, 2), '7')]),
+            # Vienas užsakymas
+            (datetime(2024, 2, 10), [(date(2024, 2, 10), '99.99')]),
+            (datetime(2024, 3, 1), [(date(2024, 3, 1), '15'), (date(2024, 3, 20), '15')]),
+            # Kohortos riba: paskutinė gruodžio minutė
+            (datetime(2023, 12, 31, 23, 59), [(date(2024, 2, 1), '42.42'), (date(2024, 2, 1), '0.01')]),
+        ]):
+            client = Client.objects.create(
+                first_name=f'Vardas{number}', last_name='Pavardė', email=f'klientas{number}@example.com',
+                created_at=timezone.make_aware(created),
+            )
+            for order_date, amount in orders:
+                Order.objects.create(client=client, order_date=order_date, total_amount=Decimal(amount))
+
+    def assertStatsEqual(self, stats, expected, name):
+        stats, expected = stats.reset_index(drop=True), expected.reset_index(drop=True)
+        pd.testing.assert_frame_equal(stats, expected, check_dtype=False, atol=0.005, obj=name)
+        pd.testing.assert_frame_equal(calculate_rfm(stats), calculate_rfm(expected), check_dtype=False, obj=name)
+
+    def test_backends_return_same_stats_and_rfm(self):
+        expected = get_client_stats_dataframe('pandas')
+        self.assertEqual(expected['order_count'].tolist(), [4, 1, 2, 2])
+        # Procesų telkinys naudojamas ir su keliais užsakymais
+        with mock.patch('dashboard.parallel.MIN_PARALLEL_ROWS', 0):
+            for name in ANALYTICS_BACKENDS:
+                self.assertStatsEqual(get_client_stats_dataframe(name), expected, name)
+
+    def test_windowed_stats_match_filtered_orders(self):
+        for window in [
+            DateWindow(start=date(2024, 2, 1), end=date(2024, 3, 1)),
+            DateWindow(end=date(2024, 2, 1)),
+            DateWindow(cohort_start=date(2024, 1, 1), cohort_end=date(2024, 2, 1)),
+            DateWindow(start=date(2024, 2, 1), cohort_end=date(2024, 1, 1)),
+        ]:
+            orders = Order.objects.all()
+            if window.start:
+                orders = orders.filter(order_date__gte=window.start)
+            if window.end:
+                orders = orders.filter(order_date__lt=date(window.end.year, window.end.month + 1, 1))
+            if window.cohort_start:
+                orders = orders.filter(client__created_at__gte=timezone.make_aware(
+                    datetime.combine(window.cohort_start, datetime.min.time())
+                ))
+            if window.cohort_end:
+                orders = orders.filter(client__created_at__lt=timezone.make_aware(
+                    datetime(window.cohort_end.year, window.cohort_end.month + 1, 1)
+                ))
+            self.assertStatsEqual(
+                get_client_stats_dataframe(window=window), _stats_dataframe(client_aggregate_queryset(orders)),
+                window.key,
+            )
+
+    def test_backend_key_error_is_not_reported_as_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_client_stats_dataframe('nera')
+        with mock.patch.dict(ANALYTICS_BACKENDS, {'pandas': mock.Mock(side_effect=KeyError('total_amount'))}):
+            with self.assertRaises(KeyError):
+                get_client_stats_dataframe('pandas')
+
+
+# Testų duomenys matomi tik testo transakcijoje, todėl analitika vykdoma Django sinchroninėje gijoje
+@override_settings(ANALYTICS_THREADS=0, ANALYTICS_SNAPSHOT_DIR=None)
+class EmptyWindowTests(TestCase):
+    """Laikotarpis be užsakymų turi rodyti tuščius puslapius ir diagramas, o ne 500"""
+    EMPTY_WINDOW = {'from': '2030-01'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analitikas', password='slaptazodis')
+        for number, (created, amounts) in enumerate([
+            (date(2024, 1, 5), [120, 80, 45]),
+            (date(2024, 2, 10), [300]),
+            (date(2024, 3, 1), [60, 75]),
+        ]):
+            client = Client.objects.create(
+                first_name=f'Vardas{number}', last_name='Pavardė', email=f'klientas{number}@example.com',
+                created_at=timezone.make_aware(datetime.combine(created, datetime.min.time())),
+            )
+            for offset, amount in enumerate(amounts):
+                Order.objects.create(
+                    client=client, order_date=created + timedelta(days=20 * offset), total_amount=Decimal(amount)
+                )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_dashboards(self):
+        for name in ['rfm_view', 'clv_view', 'purchase_frequency', 'cohort_view']:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), self.EMPTY_WINDOW)
+                self.assertEqual(response.status_code, 200)
+
+    def test_exports(self):
+        for name in [
+            'export_rfm_excel', 'export_rfm_pdf', 'export_clv_excel', 'export_clv_pdf',
+            'export_frequency_excel', 'export_frequency_pdf', 'export_cohort_excel', 'export_cohort_pdf',
+            'export_full_report_excel',
+        ]:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), self.EMPTY_WINDOW)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(b''.join(response.streaming_content))
+
+    def test_clv_models(self):
+        for model in CLV_MODELS:
+            with self.subTest(model=model):
+                response = self.client.get(reverse('clv_view'), {**self.EMPTY_WINDOW, 'model': model})
+                self.assertEqual(response.status_code, 200)
+
+    def test_table_json(self):
+        for name in ['rfm_data', 'clv_data', 'frequency_data']:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), self.EMPTY_WINDOW)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['count'], 0)
+
+    def test_charts(self):
+        for name, (_, fields) in CHART_SERIES.items():
+            with self.subTest(name=name):
+                response = self.client.get(reverse('chart_json', args=[name]), self.EMPTY_WINDOW)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(set(response.json()), set(fields))
+
+        series = self.client.get(reverse('chart_json', args=['rfm-scatter']), self.EMPTY_WINDOW).json()
+        self.assertEqual(series['scatter'], [])
+        series = self.client.get(reverse('chart_json', args=['rfm-histograms']), self.EMPTY_WINDOW).json()
+        self.assertEqual(series['hist_labels'], [])
+        series = self.client.get(reverse('chart_json', args=['clv-top']), self.EMPTY_WINDOW).json()
+        self.assertEqual(series, {'top_labels': [], 'top_values': []})
+
+    def test_charts_with_data(self):
+        for name in CHART_SERIES:
+            with self.subTest(name=name):
+                response = self.client.get(reverse('chart_json', args=[name]))
+                self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ANALYTICS_THREADS=0, ANALYTICS_SNAPSHOT_DIR=None)
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analitikas', password='slaptazodis')
+        self.client.force_login(self.user)
+
+    def create_job(self, kind, query):
+        response = self.client.post(f"{reverse('job_create', args=[kind])}?{query}")
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('job_detail', args=[job.pk]), fetch_redirect_response=False)
+        return job
+
+    def run_report(self, job):
+        builder = mock.Mock()
+        with tempfile.TemporaryDirectory() as root, override_settings(JOBS_ROOT=root), \
+                mock.patch.dict(jobs.PDF_REPORTS, {job.kind: (builder, 'ataskaita.pdf')}):
+            self.assertEqual(jobs.run_job(job.pk), Job.STATUS_DONE)
+        return builder.call_args.kwargs
+
+    def test_clv_report_keeps_window_and_model(self):
+        job = self.create_job('clv_pdf', 'from=2024-02&to=2024-06&model=historical&page=3&search=x')
+        self.assertEqual(job.params, {'from': '2024-02', 'to': '2024-06', 'model': 'historical'})
+        self.assertEqual(self.run_report(job), {
+            'window': DateWindow(start=date(2024, 2, 1), end=date(2024, 6, 1)),
+            'model': 'historical',
+        })
+
+    def test_pdf_button_forwards_filters(self):
+        response = self.client.get(reverse('clv_view'), {'from': '2024-02', 'model': 'historical'})
+        self.assertContains(response, f"{reverse('job_create', args=['clv_pdf'])}?from=2024-02&amp;model=historical")
+
+    def test_report_without_filters(self):
+        job = self.create_job('rfm_pdf', '')
+        self.assertEqual(job.params, {})
+        self.assertEqual(self.run_report(job), {'window': None})
+
+
+class JobAccessTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('savininkas', password='slaptazodis')
+        self.other = User.objects.create_user('kitas', password='slaptazodis')
+        self.job = Job.objects.create(kind=Job.KIND_RFM_PDF, created_by=self.owner)
+
+    def job_urls(self):
+        return [reverse(name, args=[self.job.pk]) for name in ['job_detail', 'job_status', 'job_download']]
+
+    def test_login_required(self):
+        for url in self.job_urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertRedirects(response, f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+
+    def test_other_users_job_is_hidden(self):
+        self.client.force_login(self.other)
+        for url in self.job_urls():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_owner_sees_job(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse('job_status', args=[self.job.pk])).json()['status'], Job.STATUS_QUEUED)
+
+    def test_run_jobs_fails_interrupted_jobs(self):
+        with tempfile.NamedTemporaryFile(delete=False) as upload:
+            pass
+        Job.objects.filter(pk=self.job.pk).update(status=Job.STATUS_RUNNING)
+        interrupted = Job.objects.create(
+            kind=Job.KIND_INGEST, created_by=self.owner, status=Job.STATUS_RUNNING, input_file=upload.name
+        )
+        self.assertEqual(jobs.fail_interrupted_jobs(), 2)
+        for job in Job.objects.filter(pk__in=[self.job.pk, interrupted.pk]):
+            self.assertEqual(job.status, Job.STATUS_FAILED)
+            self.assertIsNotNone(job.finished_at)
+        self.assertFalse(os.path.exists(upload.name))
+
+
+class UploadTests(TestCase):
+    def test_login_required(self):
+        response = self.client.get(reverse('upload_csv'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('upload_csv')}", fetch_redirect_response=False)
+
+    def test_upload_creates_ingest_job(self):
+        user = User.objects.create_user('analitikas', password='slaptazodis')
+        self.client.force_login(user)
+        upload = SimpleUploadedFile('orders.csv', b'client_id,first_name,last_name,email,order_date,total_amount\n')
+        with tempfile.TemporaryDirectory() as root, override_settings(JOBS_ROOT=root):
+            response = self.client.post(reverse('upload_csv'), {'csv_file': upload, 'mode': 'append'})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse('job_detail', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual((job.kind, job.created_by), (Job.KIND_INGEST_APPEND, user))
+
+
+class CohortTests(TestCase):
+    def setUp(self):
+        for email, created, order_dates in [
+            ('a@example.com', datetime(2024, 1, 15), [date(2024, 1, 15), date(2024, 2, 20)]),
+            ('b@example.com', datetime(2024, 2, 29, 23, 30), [date(2024, 3, 1)]),
+        ]:
+            client = Client.objects.create(
+                first_name='Vardas', last_name='Pavardė', email=email, created_at=timezone.make_aware(created)
+            )
+            for order_date in order_dates:
+                Order.objects.create(client=client, order_date=order_date, total_amount=Decimal(10))
+
+    def matrices(self, window=None):
+        return build_cohort_matrices(cohort_activity_queryset(window), cohort_sizes_queryset(window))
+
+    def assertCohortStatsCurrent(self):
+        """CohortMonthlyStats turi sutapti su agregacija per ClientMonthlyStats"""
+        expected = ClientMonthlyStats.objects.values('cohort_month', 'month').annotate(
+            clients=Count('id'), revenue=Sum('revenue')
+        ).order_by('cohort_month', 'month')
+        self.assertEqual(
+            list(CohortMonthlyStats.objects.order_by('cohort_month', 'month').values(
+                'cohort_month', 'month', 'clients', 'revenue'
+            )),
+            list(expected),
+        )
+
+    def test_cohort_month_follows_created_at(self):
+        self.assertEqual(
+            dict(Client.objects.values_list('email', 'cohort_month')),
+            {'a@example.com': date(2024, 1, 1), 'b@example.com': date(2024, 2, 1)},
+        )
+        retention, revenue = self.matrices()
+        self.assertEqual(retention.to_dict('index'), {
+            '2024-01': {'Klientai': 1, '0': 100.0, '1': 100.0},
+            '2024-02': {'Klientai': 1, '0': 0.0, '1': 100.0},
+        })
+        retention, _ = self.matrices(DateWindow(cohort_start=date(2024, 2, 1)))
+        self.assertEqual(retention.index.tolist(), ['2024-02'])
+        self.assertCohortStatsCurrent()
+
+    def test_order_delete_refreshes_cohort_stats(self):
+        Order.objects.get(order_date=date(2024, 2, 20)).delete()
+        self.assertCohortStatsCurrent()
+        retention, _ = self.matrices()
+        self.assertEqual(retention.loc['2024-01'].to_dict(), {'Klientai': 1, '0': 100.0, '1': 0.0})
+
+    def test_append_moves_client_to_earlier_cohort(self):
+        upload = BytesIO(
+            b'client_id,first_name,last_name,email,order_date,total_amount\n'
+            b'2,Vardas,Pavarde,b@example.com,2024-01-10,5\n'
+        )
+        upload.name = 'orders.csv'
+        append_orders(upload)
+
+        client = Client.objects.get(email='b@example.com')
+        self.assertEqual(client.cohort_month, date(2024, 1, 1))
+        self.assertEqual(set(ClientMonthlyStats.objects.filter(client=client).values_list('cohort_month', flat=True)),
+                         {date(2024, 1, 1)})
+        retention, _ = self.matrices()
+        self.assertEqual(retention.to_dict('index'), {'2024-01': {'Klientai': 2, '0': 100.0, '1': 50.0, '2': 50.0}})
+        self.assertCohortStatsCurrent()
+
+
+@skipUnless(importlib.util.find_spec('scipy'), 'BG/NBD modeliui reikalingas scipy')
+class BGNBDFitTests(SimpleTestCase):
+    def simulate(self, clients=2000, seed=0):
+        """Klientai pagal BG/NBD (r=0.25, alpha=4, a=0.8, b=2.5) ir Gamma-Gamma (p=6, q=4, v=15) prielaidas"""
+        rng = np.random.default_rng(seed)
+        rows = []
+        for _ in range(clients):
+            rate, dropout = rng.gamma(0.25, 1 / 4), rng.beta(0.8, 2.5)
+            T = rng.uniform(20, 150)
+            x, t_x, t = 0, 0.0, 0.0
+            while rng.random() >= dropout:
+                t += rng.exponential(1 / rate)
+                if t > T:
+                    break
+                x, t_x = x + 1, t
+            spend_rate = rng.gamma(4, 1 / 15)
+            value = rng.gamma(6 * max(x, 1), 1 / spend_rate) / max(x, 1)
+            rows.append((x, t_x, T, value))
+        return pd.DataFrame(rows, columns=['x', 't_x', 'T', 'avg_order_value'])
+
+    def test_fit_converges_on_model_data(self):
+        features = self.simulate()
+        model = BGNBDGammaGammaCLV().fit(features)
+        self.assertEqual(model.warnings, [])
+        self.assertTrue(np.isfinite(model.predict(features)).all())
+        p, q, v = model.gamma_gamma_params
+        self.assertAlmostEqual(p * v / (q - 1), 30, delta=10)
+
+    def test_degenerate_gamma_gamma_falls_back_to_average_order_value(self):
+        # Visų užsakymų vertė vienoda – sklaidos nėra, p ir q išbėga iki ribų
+        features = self.simulate().assign(avg_order_value=25.0)
+        with self.assertLogs('dashboard.clv.probabilistic', level='WARNING'):
+            model = BGNBDGammaGammaCLV().fit(features)
+        self.assertIsNone(model.gamma_gamma_params)
+        self.assertEqual(len(model.warnings), 1)
+        np.testing.assert_allclose(
+            model.predict(features), model.expected_purchases(features) * features['avg_order_value'].to_numpy()
+        )
+
+
+class IngestJobTests(TestCase):
+    def run_ingest(self, **snapshot_patch):
+        with tempfile.TemporaryDirectory() as root, override_settings(JOBS_ROOT=root), \
+                mock.patch('dashboard.snapshot.refresh_snapshot', **snapshot_patch):
+            path = os.path.join(root, 'orders.csv')
+            with open(path, 'wb') as file:
+                file.write(
+                    b'client_id,first_name,last_name,email,order_date,total_amount\n'
+                    b'1,Vardas,Pavarde,a@example.com,2024-01-10,5\n'
+                )
+            job = Job.objects.create(kind=Job.KIND_INGEST, input_file=path)
+            status = jobs.run_job(job.pk)
+        job.refresh_from_db()
+        return status, job
+
+    def test_snapshot_failure_keeps_committed_ingest_done(self):
+        with self.assertLogs('dashboard.snapshot', level='ERROR'):
+            status, job = self.run_ingest(side_effect=OSError('diskas pilnas'))
+        self.assertEqual((status, job.status), (Job.STATUS_DONE, Job.STATUS_DONE))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertIn('momentinė kopija neatnaujinta: diskas pilnas', job.message)
+
+    def test_successful_snapshot_has_no_warning(self):
+        status, job = self.run_ingest()
+        self.assertEqual(status, Job.STATUS_DONE)
+        self.assertEqual(job.message, '✅ Įkelta klientų: 1, užsakymų: 1.')
+
+
+class ValidateChunkTests(SimpleTestCase):
+    HEADER = b'client_id,first_name,last_name,email,order_date,total_amount\n'
+
+    def validate(self, rows, chunksize=2):
+        upload = BytesIO(self.HEADER + rows)
+        upload.name = 'orders.csv'
+        return [validate_chunk(chunk) for chunk in read_chunks(upload, chunksize)]
+
+    def test_blank_required_cell_reports_file_row(self):
+        with self.assertRaisesMessage(IngestError, '4-oje eilutėje neužpildytas privalomas stulpelis „total_amount“'):
+            self.validate(
+                b'1,Vardas,Pavarde,a@example.com,2024-01-10,5\n'
+                b'2,Vardas,Pavarde,b@example.com,2024-01-10,5\n'
+                b'3,Vardas,Pavarde,c@example.com,2024-01-10,\n'
+            )
+
+    def test_whitespace_only_cell_is_blank(self):
+        with self.assertRaisesMessage(IngestError, '2-oje eilutėje neužpildytas privalomas stulpelis „email“'):
+            self.validate(b'1,Vardas,Pavarde, ,2024-01-10,5\n')
+
+    def test_complete_rows_pass(self):
+        chunks = self.validate(b'1,Vardas,Pavarde,a@example.com,2024-01-10,5\n')
+        self.assertEqual(chunks[0]['total_amount'].tolist(), [5.0])
+
+
+class IngestOrdersTests(TestCase):
+    def test_external_id_repeated_in_later_chunk_replaces_order(self):
+        upload = BytesIO(
+            b'client_id,first_name,last_name,email,order_date,total_amount,external_id\n'
+            b'1,Vardas,Pavarde,a@example.com,2024-01-10,5,X-1\n'
+            b'1,Vardas,Pavarde,a@example.com,2024-01-11,6,\n'
+            b'2,Vardas,Pavarde,b@example.com,2024-02-10,7,X-2\n'
+            b'2,Vardas,Pavarde,b@example.com,2024-02-12,8,X-1\n'
+            b'2,Vardas,Pavarde,b@example.com,2024-02-12,9,X-2\n'
+        )
+        upload.name = 'orders.csv'
+        result = ingest_orders(upload, chunksize=2)
+
+        self.assertEqual((result.orders, result.orders_skipped), (3, 2))
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertEqual(
+            set(Order.objects.filter(external_id__startswith='X-').values_list('external_id', 'client__email', 'total_amount')),
+            {('X-1', 'b@example.com', Decimal('8.00')), ('X-2', 'b@example.com', Decimal('9.00'))},
+        )
+
+
+# Benchmark'as paleidžiamas mažu dydžiu: tikrinama, kad kiekvienas žingsnis veikia ir įrašomas JSON
+@override_settings(ANALYTICS_SNAPSHOT_DIR=None)
+class BenchmarkCommandTests(TestCase):
+    def run_benchmark(self, *args, name='benchmark.json', **options):
+        output = os.path.join(self.directory.name, name)
+        call_command('benchmark', *args, output=output, stdout=StringIO(), **options)
+        with open(output, encoding='utf-8') as file:
+            return output, json.load(file)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_every_step_is_measured_and_data_rolled_back(self):
+        _, report = self.run_benchmark('--orders', '300', '--groups', 'analytics', 'views', 'exports', 'cohorts')
+        steps = {(row['group'], row['name']): row for row in report['results']}
+        self.assertEqual(set(steps), {
+            *(('analytics', name) for name, _ in analytics_steps()),
+            *(('views', url) for url in BENCHMARK_VIEWS),
+            *(('exports', url) for url in BENCHMARK_EXPORTS),
+            *(('cohorts', name) for name, _ in cohort_steps(None)),
+        })
+        for row in steps.values():
+            self.assertEqual(row['orders'], 300)
+            self.assertGreaterEqual(row['peak_rss_mb'], row['start_rss_mb'])
+            self.assertGreater(row['queries'] + row['seconds'], 0)
+        self.assertFalse(Order.objects.exists())
+
+    def test_compare_fails_on_regression(self):
+        baseline, report = self.run_benchmark('--orders', '300', '--groups', 'cohorts')
+        for row in report['results']:
+            row['seconds'] = 1e-6
+        with open(baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
+        with self.assertRaisesMessage(CommandError, 'Regresijos'):
+            self.run_benchmark('--orders', '300', '--groups', 'cohorts', name='current.json', compare=baseline)
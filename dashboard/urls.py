@@ -6,20 +6,36 @@ urlpatterns = [
     path('', views.index, name='home'),
 
     path('rfm/', views.rfm_view, name='rfm_view'),
+    path('rfm/data/', views.rfm_data_json, name='rfm_data'),
     path('rfm/excel/', views.export_rfm_excel, name='export_rfm_excel'),
     path('rfm/pdf/', views.export_rfm_pdf, name='export_rfm_pdf'),
 
     path('clv/', views.clv_view, name='clv_view'),
+    path('clv/data/', views.clv_data_json, name='clv_data'),
     path('export/clv/excel/', views.export_clv_excel, name='export_clv_excel'),
     path('export/clv/pdf/', views.export_clv_pdf, name='export_clv_pdf'),
 
     path('frequency/', views.frequency_view, name='purchase_frequency'),
+    path('frequency/data/', views.frequency_data_json, name='frequency_data'),
     path('export/frequency/excel/', views.export_frequency_excel, name='export_frequency_excel'),
     path('export/frequency/pdf/', views.export_frequency_pdf, name='export_frequency_pdf'),
 
+    path('cohort/', views.cohort_view, name='cohort_view'),
+    path('export/cohort/excel/', views.export_cohort_excel, name='export_cohort_excel'),
+    path('export/cohort/pdf/', views.export_cohort_pdf, name='export_cohort_pdf'),
+
+    path('charts/<str:name>/', views.chart_json, name='chart_json'),
+
+    path('export/report/excel/', views.export_full_report_excel, name='export_full_report_excel'),
+
     path('upload/', views.upload_csv, name='upload_csv'),
     path('export_orders', views.export_orders_csv, name='export_orders'),
 
+    path('jobs/new/<str:kind>/', views.job_create, name='job_create'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+
     path('apie/', views.about_view, name='apie'),
     path('prisijungti/', auth_views.LoginView.as_view(template_name='dashboard/login.html'), name='login'),
     path('atsijungti/', auth_views.LogoutView.as_view(next_page='/prisijungti/'), name='logout'),
@@ -1,521 +1,384 @@
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 
+import csv
+import functools
+import hashlib
 import io
-
-from dashboard.models import Client, Order
-from .rfm import calculate_rfm
-from .clv import calculate_clv
-
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+import tempfile
+import zlib
+
+from dashboard.models import DatasetVersion, Job, Order
+from .analytics import (
+    get_clv_charts, get_clv_frame, get_cohort_matrices, get_fitted_clv_model, get_frequency_charts,
+    get_frequency_frame, get_rfm_charts, get_rfm_frame,
+)
+from .backends import DateWindow
+from .clv import CLV_MODELS
+from .concurrency import gather_blocking, run_blocking
+from .excel import (
+    build_clv_excel, build_cohort_excel, build_frequency_excel, build_full_report_excel, build_rfm_excel,
+)
+from .cohorts import SIZE_COLUMN
+from .jobs import enqueue_ingest, enqueue_report
+from .profiling import instrument
+
+from .reports import PDF_REPORTS, build_clv_pdf, build_cohort_pdf, build_frequency_pdf, build_rfm_pdf
 
 
 from urllib.parse import urlencode
 
-from django.shortcuts import render, redirect
+from django.conf import settings
+from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-import pandas as pd
-
-import json
+from django.core.paginator import Paginator
+
+# Šablonų atvaizdavimas matomas kaip atskiras Server-Timing etapas
+render = instrument('render')(render)
+
+EXPORT_CHUNK_SIZE = 2000
+# Iki tiek baitų eksportas laikomas atmintyje, didesnis perkeliamas į laikiną failą
+EXPORT_SPOOL_SIZE = 8 * 2 ** 20
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+RFM_SORT_FIELDS = ['first_name', 'last_name', 'email', 'Recency', 'Frequency', 'Monetary']
+CLV_SORT_FIELDS = ['first_name', 'last_name', 'email', 'CLV']
+FREQUENCY_SORT_FIELDS = ['first_name', 'last_name', 'email', 'order_count']
+
+# Diagrama -> (puslapis, jos serijų laukai chart_series rezultate)
+CHART_SERIES = {
+    'rfm-segments': ('rfm', ['segment_labels', 'segment_values']),
+    'rfm-scatter': ('rfm', ['scatter']),
+    'rfm-segment-averages': ('rfm', ['segment_avg_labels', 'segment_values_avg']),
+    'rfm-histograms': ('rfm', ['hist_labels', 'hist_recency', 'hist_frequency', 'hist_monetary']),
+    'clv-histogram': ('clv', ['hist_labels', 'hist_values']),
+    'clv-top': ('clv', ['top_labels', 'top_values']),
+    'clv-segments': ('clv', ['segment_labels', 'segment_values']),
+    'clv-monthly': ('clv', ['monthly_labels', 'monthly_values']),
+    'frequency-distribution': ('frequency', ['freq_labels', 'freq_values', 'cumulative_values']),
+    'frequency-revenue': ('frequency', ['freq_revenue_labels', 'freq_revenue_values']),
+    'frequency-intervals': ('frequency', ['interval_labels', 'interval_values']),
+}
 
 
 def get_clean_filters(request, exclude_keys=['sort', 'order', 'page']):
     """Grąžina GET parametrus be sort/order/page (naudojama rikiavimui)"""
     return urlencode({k: v for k, v in request.GET.items() if k not in exclude_keys})
 
-def get_orders_dataframe():
-    orders = Order.objects.select_related('client').values(
-        'id',
-        'client__id',
-        'client__first_name',
-        'client__last_name',
-        'client__email',
-        'order_date',
-        'total_amount'
-    )
-    df = pd.DataFrame(list(orders))
-    df.rename(columns={
-        'client__id': 'client_id',
-        'client__first_name': 'first_name',
-        'client__last_name': 'last_name',
-        'client__email': 'email'
-    }, inplace=True)
-    df['order_date'] = pd.to_datetime(df['order_date'])
-    df['total_amount'] = df['total_amount'].astype(float)
-    return df
-
-def rfm_view(request):
-    df = get_orders_dataframe()
-    rfm_df = calculate_rfm(df)
-
+def filter_table(frame, request, sort_fields):
+    """Pritaiko paiešką ir rikiavimą visai lentelei (prieš puslapiavimą)"""
     email_query = request.GET.get('search', '')
     if email_query:
-        rfm_df = rfm_df[rfm_df['email'].str.contains(email_query, case=False)]
+        frame = frame[frame['email'].str.contains(email_query, case=False, regex=False)]
 
     sort_field = request.GET.get('sort')
     order = request.GET.get('order', 'asc')
-    if sort_field in ['first_name', 'last_name', 'email', 'Recency', 'Frequency', 'Monetary']:
-        ascending = True if order == 'asc' else False
-        rfm_df = rfm_df.sort_values(by=sort_field, ascending=ascending)
-
-    rfm_data = rfm_df.to_dict('records')
-
-    segment_stats = rfm_df['Segmentas'].value_counts().to_dict()
-    monthly = df.copy()
-    monthly['year_month'] = pd.to_datetime(monthly['order_date']).dt.to_period('M')
-
-    max_recency = rfm_df['Recency'].max()
-    max_frequency = rfm_df['Frequency'].max()
-    max_monetary = rfm_df['Monetary'].max()
-
-    segment_avg_data = rfm_df.groupby('Segmentas')[['Recency', 'Frequency', 'Monetary']].mean().round(1)
-    segment_values_normalized = {
-        'Recency': (segment_avg_data['Recency'] / max_recency * 100).round(1).tolist(),
-        'Frequency': (segment_avg_data['Frequency'] / max_frequency * 100).round(1).tolist(),
-        'Monetary': (segment_avg_data['Monetary'] / max_monetary * 100).round(1).tolist(),
-    }
-
-    segment_labels_normalized = segment_avg_data.index.tolist()
-
-
-    hist_recency = pd.cut(rfm_df['Recency'], bins=10).value_counts().sort_index()
-    hist_frequency = pd.cut(rfm_df['Frequency'], bins=10).value_counts().sort_index()
-    hist_monetary = pd.cut(rfm_df['Monetary'], bins=10).value_counts().sort_index()
-
-    hist_labels = [f"{int(interval.left)}-{int(interval.right)}" for interval in hist_recency.index]
-
-    context = {
-        'rfm_data': rfm_data,
-        'segment_stat_labels': list(segment_stats.keys()),
-        'segment_stat_values': list(segment_stats.values()),
-        'segment_avg_labels': segment_avg_data.index.tolist(),
-        'rfm_avg_data': segment_avg_data.to_dict(orient='index'),
+    if sort_field in sort_fields:
+        frame = frame.sort_values(by=sort_field, ascending=order == 'asc', kind='stable')
+
+    return frame, email_query, sort_field, order
+
+def paginate_table(frame, request):
+    """Grąžina Paginator puslapį ir tik to puslapio eilutes"""
+    try:
+        page_size = min(max(int(request.GET.get('page_size', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = PAGE_SIZE
+
+    page = Paginator(range(len(frame)), page_size).get_page(request.GET.get('page'))
+    rows = frame.iloc[page.object_list.start:page.object_list.stop]
+    return page, rows
+
+@instrument('json')
+def table_json(frame, request, sort_fields):
+    frame, _, _, _ = filter_table(frame, request, sort_fields)
+    page, rows = paginate_table(frame, request)
+    return JsonResponse({
+        'count': page.paginator.count,
+        'num_pages': page.paginator.num_pages,
+        'page': page.number,
+        'page_size': page.paginator.per_page,
+        'results': rows.to_dict('records'),
+    })
 
+def get_window(request):
+    """Datų intervalas (from/to) ir kohortos (cohort_from/cohort_to) filtrai iš GET, formatas YYYY-MM"""
+    return DateWindow.from_query(request.GET)
+
+def get_clv_model_name(request):
+    """Grąžina GET parametre nurodytą CLV modelį arba numatytąjį iš nustatymų"""
+    model = request.GET.get('model')
+    return model if model in CLV_MODELS else settings.CLV_MODEL
+
+def get_chart_query(request):
+    """Diagramų užklausų parametrai: tik laikotarpis ir modelis, kad ETag nepriklausytų nuo paieškos ar puslapio"""
+    return get_clean_filters(request, exclude_keys=['sort', 'order', 'page', 'search'])
+
+def rfm_context(request, frame):
+    rfm_df, email_query, sort_field, order = filter_table(frame, request, RFM_SORT_FIELDS)
+    page, rows = paginate_table(rfm_df, request)
+
+    return {
+        'rfm_data': rows.to_dict('records'),
+        'page_obj': page,
+        'page_filters': get_clean_filters(request, exclude_keys=['page']),
+        'sort_filters': get_clean_filters(request),
+        'chart_query': get_chart_query(request),
         'email_query': email_query,
         'sort': sort_field,
         'order': order,
-
-        'rfm_scatter_data': [
-        {'x': row['Recency'], 'y': row['Frequency']}
-        for row in rfm_df[['Recency', 'Frequency']].to_dict(orient='records')
-        ],
-
-        'hist_labels': hist_labels,
-        'hist_recency': hist_recency.to_list(),
-        'hist_frequency': hist_frequency.to_list(),
-        'hist_monetary': hist_monetary.to_list(),
-
-        'segment_labels': list(segment_stats.keys()),
-        'segment_values': list(segment_stats.values()),
-        'segment_counts_labels': list(segment_stats.keys()),
-        'segment_counts_values': list(segment_stats.values()),
-        'segment_labels_avg': segment_labels_normalized,
-        'segment_values_avg': segment_values_normalized,
     }
 
-    return render(request, 'dashboard/rfm.html', context)
-
-def clv_view(request):
-    df = get_orders_dataframe()
-
-    rfm = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'order_date': lambda x: (df['order_date'].max() - x.max()).days,
-        'id': 'count',
-        'total_amount': 'sum'
-    }).reset_index()
-
-    rfm.columns = ['client_id', 'first_name', 'last_name', 'email', 'Recency', 'Frequency', 'Monetary']
-
-    rfm['CLV'] = rfm['Frequency'] * rfm['Monetary']
-
-    email_query = request.GET.get('search', '')
-    if email_query:
-        rfm = rfm[rfm['email'].str.contains(email_query, case=False)]
-
-    sort_field = request.GET.get('sort')
-    order = request.GET.get('order', 'asc')
-    if sort_field in ['first_name', 'last_name', 'email', 'CLV']:
-        ascending = order == 'asc'
-        rfm = rfm.sort_values(by=sort_field, ascending=ascending)
-
-    clv_data = rfm.to_dict('records')
-
-    max_clv = rfm['CLV'].max()
-    bins = list(range(0, int(max_clv) + 1000, 1000))
-
-    hist = pd.cut(rfm['CLV'], bins=bins, right=False).value_counts().sort_index()
-
-    hist_labels = [f"{int(interval.left)}–{int(interval.right)}" for interval in hist.index]
-    hist_values = hist.values.tolist()
-
-    top_clients = rfm.nlargest(5, 'CLV')
-    top_labels = top_clients['first_name'].tolist()
-    top_values = top_clients['CLV'].tolist()
-
-    rfm['CLV_segment'] = pd.qcut(rfm['CLV'], q=3, labels=['Žemas', 'Vidutinis', 'Aukštas'])
-
-    segment_avg = rfm.groupby('CLV_segment')['CLV'].mean().round(2).to_dict()
-
-    segment_labels = list(segment_avg.keys())
-    segment_values = [float(x) for x in segment_avg.values()]
-
-    monthly = df.copy()
-    monthly['year_month'] = pd.to_datetime(monthly['order_date']).dt.to_period('M')
-    monthly_agg = monthly.groupby('year_month')['total_amount'].sum().reset_index()
-    monthly_labels = monthly_agg['year_month'].astype(str).tolist()
-    monthly_values = monthly_agg['total_amount'].tolist()
-
-    context = {
-        'clv_data': clv_data,
+def clv_context(request, frame, clv_model):
+    clv, email_query, sort_field, order = filter_table(frame, request, CLV_SORT_FIELDS)
+    page, rows = paginate_table(clv, request)
+
+    return {
+        'clv_data': rows.to_dict('records'),
+        'page_obj': page,
+        'page_filters': get_clean_filters(request, exclude_keys=['page']),
+        'sort_filters': get_clean_filters(request),
+        'chart_query': get_chart_query(request),
+        'clv_model': clv_model,
+        'clv_models': [(name, model.label) for name, model in CLV_MODELS.items()],
+        'clv_warnings': getattr(get_fitted_clv_model(clv_model), 'warnings', []),
         'email_query': email_query,
         'sort': sort_field,
         'order': order,
-        'hist_labels': hist_labels,
-        'hist_values': hist_values,
-        'top_labels': top_labels,
-        'top_values': top_values,
-        'segment_labels': segment_labels,
-        'segment_values': segment_values,
-        'monthly_labels': monthly_labels,
-        'monthly_values': monthly_values,
     }
 
-    return render(request, 'dashboard/clv.html', context)
-
-def frequency_view(request):
-    df = get_orders_dataframe()
-
-    frequency = df.groupby('client_id').size()
-    revenue = df.groupby('client_id')['total_amount'].sum()
-
-    freq_distribution = frequency.value_counts().sort_index()
-    freq_labels = freq_distribution.index.astype(str).tolist()
-    freq_values = freq_distribution.values.tolist()
-
-    cumulative_values = pd.Series(freq_values).cumsum().tolist()
-
-    freq_revenue = frequency.groupby(frequency).apply(
-        lambda x: revenue[x.index].sum()
-    ).sort_index()
-    freq_revenue_labels = freq_revenue.index.astype(str).tolist()
-    freq_revenue_values = freq_revenue.values.round(2).tolist()
-
-    bins = [1, 5, 10, 15, 20, 25, 30, 1000]
-    labels = ['1-5', '6-10', '11-15', '16-20', '21-25', '26-30', '31+']
-
-    freq_binned = pd.cut(frequency, bins=bins, labels=labels, right=True, include_lowest=True)
-    freq_percent = freq_binned.value_counts().sort_index()
-
-    interval_labels = freq_percent.index.astype(str).tolist()
-    interval_values = freq_percent.values.tolist()
-
-    client_data = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'id': 'count'
-    }).reset_index().rename(columns={'id': 'order_count'})
-
-    context = {
-        'client_data': client_data.to_dict('records'),
+def frequency_context(request, frame):
+    table, email_query, sort_field, order = filter_table(frame, request, FREQUENCY_SORT_FIELDS)
+    page, rows = paginate_table(table, request)
 
-        'freq_labels': json.dumps(freq_labels),
-        'freq_values': json.dumps(freq_values),
-        'cumulative_values': json.dumps(cumulative_values),
-        'freq_revenue_labels': json.dumps(freq_revenue_labels),
-        'freq_revenue_values': json.dumps(freq_revenue_values),
-        'interval_labels': json.dumps(interval_labels),
-        'interval_values': json.dumps(interval_values),
+    return {
+        'client_data': rows.drop(columns='total_spent').to_dict('records'),
+        'page_obj': page,
+        'page_filters': get_clean_filters(request, exclude_keys=['page']),
+        'sort_filters': get_clean_filters(request),
+        'chart_query': get_chart_query(request),
+        'email_query': email_query,
+        'sort': sort_field,
+        'order': order,
     }
 
-    return render(request, 'dashboard/frequency.html', context)
+def render_page(request, template, build_context, *args):
+    return render(request, template, build_context(request, *args))
+
+# Puslapiai – async: lentelės duomenys ir diagramų serijos ruošiami lygiagrečiai telkinyje
+# (bendra klientų suvestinė get_cached dėka skaičiuojama vieną kartą), todėl vėlesnės
+# /charts/ užklausos jau randa rezultatą podėlyje
+
+async def rfm_view(request):
+    window = get_window(request)
+    frame, _ = await gather_blocking((get_rfm_frame, window), (get_rfm_charts, window))
+    return await run_blocking(render_page, request, 'dashboard/rfm.html', rfm_context, frame)
+
+async def clv_view(request):
+    clv_model = get_clv_model_name(request)
+    window = get_window(request)
+    frame, _ = await gather_blocking((get_clv_frame, clv_model, window), (get_clv_charts, clv_model, window))
+    return await run_blocking(render_page, request, 'dashboard/clv.html', clv_context, frame, clv_model)
+
+async def frequency_view(request):
+    window = get_window(request)
+    frame, _ = await gather_blocking((get_frequency_frame, window), (get_frequency_charts, window))
+    return await run_blocking(render_page, request, 'dashboard/frequency.html', frequency_context, frame)
+
+
+def chart_series(request, dashboard):
+    """Visos puslapio diagramų serijos; skaičiuojamos vieną kartą duomenų kartai ir laikotarpiui"""
+    window = get_window(request)
+    if dashboard == 'rfm':
+        return get_rfm_charts(window)
+    if dashboard == 'clv':
+        return get_clv_charts(get_clv_model_name(request), window)
+    return get_frequency_charts(window)
+
+def chart_etag(request, name):
+    key = f"{request.dataset_version.cache_key}:{request.get_full_path()}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def chart_last_modified(request, name):
+    return request.dataset_version.updated_at
+
+def with_dataset_version(view):
+    """DatasetVersion nuskaitoma iš anksto telkinyje – condition() ETag ir Last-Modified funkcijos
+    kviečiamos sinchroniškai ir async view'e negali daryti ORM užklausų"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.dataset_version = await run_blocking(DatasetVersion.current)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+@with_dataset_version
+@cache_control(max_age=0, must_revalidate=True)
+@condition(etag_func=chart_etag, last_modified_func=chart_last_modified)
+async def chart_json(request, name):
+    """Vienos diagramos duomenys JSON formatu; kartojant užklausą su If-None-Match grąžinamas 304"""
+    if name not in CHART_SERIES:
+        raise Http404
+    dashboard, fields = CHART_SERIES[name]
+    series = await run_blocking(chart_series, request, dashboard)
+    return JsonResponse({field: series[field] for field in fields})
+
+
+async def rfm_data_json(request):
+    frame = await run_blocking(get_rfm_frame, get_window(request))
+    return await run_blocking(table_json, frame, request, RFM_SORT_FIELDS)
+
+async def clv_data_json(request):
+    frame = await run_blocking(get_clv_frame, get_clv_model_name(request), get_window(request))
+    return await run_blocking(table_json, frame, request, CLV_SORT_FIELDS)
+
+async def frequency_data_json(request):
+    frame = await run_blocking(get_frequency_frame, get_window(request))
+    return await run_blocking(table_json, frame, request, FREQUENCY_SORT_FIELDS)
+
+
+def spooled_response(filename, build, *args):
+    """build(output, *args) rašo į laikiną failą, kuris grąžinamas dalimis per FileResponse;
+    turinio tipas nustatomas pagal failo plėtinį"""
+    output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    try:
+        build(output, *args)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename)
 
 
 @login_required
 def export_rfm_excel(request):
-    df = get_orders_dataframe()
-    rfm_df = calculate_rfm(df)
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        rfm_df.to_excel(writer, index=False, sheet_name='RFM')
-    output.seek(0)
-
-    return HttpResponse(
-        output,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment; filename="rfm_analize.xlsx"'}
-    )
+    return spooled_response('rfm_analize.xlsx', build_rfm_excel, get_window(request))
 
 @login_required
 def export_rfm_pdf(request):
-    df = get_orders_dataframe()
-    rfm_df = calculate_rfm(df)
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title = Paragraph("AITI Group – RFM analizės ataskaita", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-
-    data = [rfm_df.columns.tolist()] + rfm_df.values.tolist()
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    elements.append(table)
-    doc.build(elements)
-
-    buffer.seek(0)
-    return HttpResponse(buffer, content_type='application/pdf', headers={
-        'Content-Disposition': 'attachment; filename="rfm_analize.pdf"'
-    })
+    return spooled_response('rfm_analize.pdf', build_rfm_pdf, get_window(request))
 
 @login_required
 def export_clv_excel(request):
-    df = get_orders_dataframe()
-
-    rfm = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'order_date': lambda x: (df['order_date'].max() - x.max()).days,
-        'id': 'count',
-        'total_amount': 'sum'
-    }).reset_index()
-
-    rfm.columns = ['client_id', 'first_name', 'last_name', 'email', 'Recency', 'Frequency', 'Monetary']
-    rfm['CLV'] = rfm['Frequency'] * rfm['Monetary']
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        rfm.to_excel(writer, index=False, sheet_name='CLV')
-    output.seek(0)
-
-    return HttpResponse(
-        output,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment; filename="clv_analize.xlsx"'}
-    )
+    return spooled_response('clv_analize.xlsx', build_clv_excel, get_clv_model_name(request), get_window(request))
 
 @login_required
 def export_clv_pdf(request):
-    df = get_orders_dataframe()
-
-    rfm = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'order_date': lambda x: (df['order_date'].max() - x.max()).days,
-        'id': 'count',
-        'total_amount': 'sum'
-    }).reset_index()
-
-    rfm.columns = ['client_id', 'first_name', 'last_name', 'email', 'Recency', 'Frequency', 'Monetary']
-    rfm['CLV'] = rfm['Frequency'] * rfm['Monetary']
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title = Paragraph("AITI Group – CLV analizės ataskaita", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-
-    data = [rfm.columns.tolist()] + rfm.values.tolist()
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    elements.append(table)
-    doc.build(elements)
-
-    buffer.seek(0)
-    return HttpResponse(buffer, content_type='application/pdf', headers={
-        'Content-Disposition': 'attachment; filename="clv_analize.pdf"'
-    })
+    return spooled_response('clv_analize.pdf', build_clv_pdf, get_clv_model_name(request), get_window(request))
 
 @login_required
 def export_frequency_excel(request):
-    df = get_orders_dataframe()
-
-    client_data = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'id': 'count'
-    }).reset_index().rename(columns={'id': 'order_count'})
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        client_data.to_excel(writer, index=False, sheet_name='Purchase Frequency')
-    output.seek(0)
+    return spooled_response('purchase_frequency.xlsx', build_frequency_excel, get_window(request))
+
+@login_required
+def export_frequency_pdf(request):
+    return spooled_response('purchase_frequency.pdf', build_frequency_pdf, get_window(request))
 
-    return HttpResponse(
-        output,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': 'attachment; filename="purchase_frequency.xlsx"'}
+@login_required
+def export_full_report_excel(request):
+    return spooled_response(
+        'pilna_ataskaita.xlsx', build_full_report_excel, get_clv_model_name(request), get_window(request)
     )
 
+def heatmap_rows(matrix):
+    """Matricos eilutės šablonui: kiekvienam langeliui – reikšmė ir spalvos intensyvumas (0–1)"""
+    sizes = matrix[SIZE_COLUMN]
+    values = matrix.drop(columns=SIZE_COLUMN)
+    peak = values.to_numpy().max() if values.size else 0
+    intensity = (values / peak).round(2) if peak else values * 0
+    return [
+        {'cohort': cohort, 'size': int(size), 'cells': list(zip(row, alpha))}
+        for cohort, size, row, alpha in zip(
+            matrix.index, sizes, values.values.tolist(), intensity.values.tolist()
+        )
+    ]
+
+
+def cohort_context(request, retention, revenue):
+    return {
+        'periods': retention.columns.drop(SIZE_COLUMN).tolist(),
+        'retention_rows': heatmap_rows(retention),
+        'revenue_rows': heatmap_rows(revenue),
+    }
+
+
+async def cohort_view(request):
+    retention, revenue = await run_blocking(get_cohort_matrices, get_window(request))
+    return await run_blocking(render_page, request, 'dashboard/cohort.html', cohort_context, retention, revenue)
+
+
 @login_required
-def export_frequency_pdf(request):
-    df = get_orders_dataframe()
-
-    client_data = df.groupby('client_id').agg({
-        'first_name': 'first',
-        'last_name': 'first',
-        'email': 'first',
-        'id': 'count'
-    }).reset_index().rename(columns={'id': 'order_count'})
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title = Paragraph("AITI Group – Purchase Frequency analizės ataskaita", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-
-    data = [client_data.columns.tolist()] + client_data.values.tolist()
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    elements.append(table)
-    doc.build(elements)
-
-    buffer.seek(0)
-    return HttpResponse(buffer, content_type='application/pdf', headers={
-        'Content-Disposition': 'attachment; filename="purchase_frequency.pdf"'
-    })
+def export_cohort_excel(request):
+    return spooled_response('kohortos.xlsx', build_cohort_excel, get_window(request))
 
-def export_orders_csv(request):
-    orders = Order.objects.select_related('client').all()
 
-    data = []
+@login_required
+def export_cohort_pdf(request):
+    return spooled_response('kohortos.pdf', build_cohort_pdf, get_window(request))
 
-    for order in orders:
-        data.append({
-            'client_id': order.client.id,
-            'first_name': order.client.first_name,
-            'last_name': order.client.last_name,
-            'email': order.client.email,
-            'order_date': order.order_date.strftime('%Y-%m-%d'),
-            'total_amount': order.total_amount,
-        })
+def stream_orders_csv(chunk_size=EXPORT_CHUNK_SIZE):
+    """Generuoja CSV dalimis tiesiai iš duomenų bazės kursoriaus"""
+    rows = Order.objects.order_by('pk').values_list(
+        'client_id',
+        'client__first_name',
+        'client__last_name',
+        'client__email',
+        'order_date',
+        'total_amount',
+        'external_id'
+    ).iterator(chunk_size=chunk_size)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['client_id', 'first_name', 'last_name', 'email', 'order_date', 'total_amount', 'external_id'])
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % chunk_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
-    df = pd.DataFrame(data)
+def export_orders_csv(request):
+    content = stream_orders_csv()
+    filename = 'orders_export.csv'
+    content_type = 'text/csv'
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="orders_export.csv"'
-    df.to_csv(path_or_buf=response, index=False)
+    if request.GET.get('gzip'):
+        content = gzip_stream(content)
+        filename += '.gz'
+        content_type = 'application/gzip'
 
-    return response
+    return StreamingHttpResponse(content, content_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
 
+@login_required
 def upload_csv(request):
     table_html = None
     clv_table = None
 
     if request.method == 'POST':
         file = request.FILES.get('csv_file')
-        print('🔍 Failas:', file)
-
         if not file:
-            print('❌ Failas nerastas')
             messages.error(request, 'Nepasirinktas failas.')
             return redirect('upload_csv')
 
-        try:
-            if file.name.endswith('.csv'):
-                df = pd.read_csv(file)
-            elif file.name.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(file)
-            else:
-                messages.error(request, '❌ Blogas failo formatas.')
-                return redirect('upload_csv')
-
-            print('🔍 Nuskaitytas dataframe:')
-            print(df.head())
-
-            required_columns = {'client_id', 'first_name', 'last_name', 'email', 'order_date', 'total_amount'}
-            if not required_columns.issubset(df.columns):
-                missing = required_columns - set(df.columns)
-                print('❌ Trūksta stulpelių:', missing)
-                messages.error(request, f'❌ Trūksta šių stulpelių: {", ".join(missing)}')
-                return redirect('upload_csv')
-
-            if df.empty:
-                print('❌ DataFrame yra tuščias.')
-                messages.error(request, '❌ Failas yra tuščias.')
-                return redirect('upload_csv')
-
-            try:
-                df['order_date'] = pd.to_datetime(df['order_date'])
-            except Exception as e:
-                print('❌ Datų klaida:', e)
-                messages.error(request, '❌ Blogas datos formatas.')
-                return redirect('upload_csv')
-
-            print('✅ DataFrame paruoštas įrašymui.')
-
-            Client.objects.all().delete()
-            Order.objects.all().delete()
-
-            print('🗑️ Visi senieji įrašai ištrinti.')
-
-            for client_id, client_data in df.groupby('client_id'):
-                first_name = client_data['first_name'].iloc[0]
-                last_name = client_data['last_name'].iloc[0]
-                email = client_data['email'].iloc[0]
-                created_at = client_data['order_date'].min()
-
-                client = Client.objects.create(
-                    id=client_id,
-                    first_name=first_name,
-                    last_name=last_name,
-                    email=email,
-                    created_at=created_at
-                )
-
-                for _, row in client_data.iterrows():
-                    Order.objects.create(
-                        client=client,
-                        order_date=row['order_date'],
-                        total_amount=row['total_amount']
-                    )
-
-            print('✅ Nauji klientai:', Client.objects.all().count())
-            print('✅ Nauji užsakymai:', Order.objects.all().count())
-
-            messages.success(request, '✅ Duomenys įkelti sėkmingai.')
-
-        except Exception as e:
-            print('❌ Generalinė klaida:', e)
-            messages.error(request, f'❌ Klaida apdorojant failą: {e}')
-            return redirect('upload_csv')
+        job = enqueue_ingest(file, user=request.user, append=request.POST.get('mode') == 'append')
+        messages.success(request, '✅ Failas priimtas, duomenys įkeliami fone.')
+        return redirect('job_detail', job_id=job.pk)
 
     return render(request, 'dashboard/upload.html', {
         'table_html': table_html,
@@ -525,6 +388,53 @@ def upload_csv(request):
 
 
 
+def get_user_job(request, job_id):
+    """Naudotojas mato tik savo darbus; svetimas darbas – 404, kad nebūtų matyti, jog jis egzistuoja"""
+    return get_object_or_404(Job, pk=job_id, created_by=request.user)
+
+
+@login_required
+@require_POST
+def job_create(request, kind):
+    if kind not in PDF_REPORTS:
+        raise Http404
+    job = enqueue_report(kind, user=request.user, params=request.GET)
+    return redirect('job_detail', job_id=job.pk)
+
+
+@login_required
+def job_detail(request, job_id):
+    job = get_user_job(request, job_id)
+    return render(request, 'dashboard/job.html', {'job': job})
+
+
+@login_required
+def job_status(request, job_id):
+    job = get_user_job(request, job_id)
+    download_url = None
+    if job.status == Job.STATUS_DONE and job.result_file:
+        download_url = reverse('job_download', args=[job.pk])
+
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'message': job.message,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'download_url': download_url,
+    })
+
+
+@login_required
+def job_download(request, job_id):
+    job = get_user_job(request, job_id)
+    if job.status != Job.STATUS_DONE or not job.result_file:
+        raise Http404
+    return FileResponse(open(job.result_file, 'rb'), as_attachment=True, filename=PDF_REPORTS[job.kind][1])
+
+
 def index(request):
     return render(request, 'dashboard/home.html')
 